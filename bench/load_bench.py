@@ -0,0 +1,376 @@
+# Offline load test: drives on_message and the command handlers with a
+# synthetic message stream through a fake Discord context, while every
+# upstream API is served by a local aiohttp stub server.
+#
+#   python bench/load_bench.py --messages 5000 --concurrency 50 \
+#       --upstream-latency-ms 80 --upstream-error-rate 0.05
+#
+# Reports messages/sec, per-command p50/p99 and memory growth. With any of
+# the --max-*/--min-* thresholds set it exits non-zero when a threshold is
+# missed, so it can be used as a regression gate.
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+# Stub upstream server (runs in its own process) ----------------------------
+
+def stub_app(latency: float, jitter: float, error_rate: float, seed: int) -> web.Application:
+    rng = random.Random(seed)
+
+    def handler(payload):
+        async def handle(request: web.Request) -> web.Response:
+            await asyncio.sleep(max(latency + rng.uniform(-jitter, jitter), 0))
+            if rng.random() < error_rate:
+                return web.json_response({'error': 'stub failure'}, status=rng.choice([429, 500, 503]))
+            return web.json_response(payload(request))
+        return handle
+
+    def gallery(request):
+        name = request.match_info.get('name', request.query.get('q', 'search'))
+        return {'data': [
+            {'link': f'https://i.imgur.com/{name}{i}.jpg', 'title': f'{rng.choice(KEYWORDS)} meme {i}',
+             'tags': [{'name': rng.choice(KEYWORDS)}]}
+            for i in range(30)
+        ]}
+
+    app = web.Application()
+    app.router.add_get('/3/gallery/r/{name}/hot', handler(gallery))
+    app.router.add_get('/3/gallery/search', handler(gallery))
+    app.router.add_get('/v1/iplookup', handler(lambda r: {
+        'ip': r.query.get('address'), 'country_code': 'NL', 'country': 'Netherlands',
+        'region_code': 'NH', 'region': 'North Holland', 'timezone': 'Europe/Amsterdam'}))
+    app.router.add_get('/v1/passwordgenerator', handler(lambda r: {
+        'random_password': ''.join(rng.choices('abcdefgh12345', k=int(r.query.get('length', 12))))}))
+    app.router.add_get('/v1/hobbies', handler(lambda r: {
+        'hobby': 'Gardening', 'category': 'general', 'link': 'https://example.org/gardening'}))
+    app.router.add_get('/v1/facts', handler(lambda r: [{'fact': f'Stub fact {rng.randrange(10**6)}'}]))
+    app.router.add_get('/v1/current.json', handler(lambda r: {
+        'current': {'temp_c': 17, 'condition': {'text': 'Partly cloudy'}}}))
+    return app
+
+
+def run_stub_server(port: int, latency: float, jitter: float, error_rate: float, seed: int) -> None:
+    web.run_app(stub_app(latency, jitter, error_rate, seed), host='127.0.0.1', port=port,
+                print=None, access_log=None, handle_signals=True)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'stub server did not start on port {port}')
+
+
+# Fake Discord objects ---------------------------------------------------------
+
+class FakeUser:
+    def __init__(self, user_id: int, bot: bool = False):
+        self.id = user_id
+        self.bot = bot
+        self.name = f'user{user_id}'
+        self.mention = f'<@{user_id}>'
+        self.roles = []
+
+    def __eq__(self, other):
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.name
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.name = f'guild{guild_id}'
+        self.roles = []
+        self.channels = []
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, guild: FakeGuild):
+        self.id = channel_id
+        self.guild = guild
+        self.name = f'channel{channel_id}'
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return FakeSentMessage(content)
+
+
+class FakeSentMessage:
+    def __init__(self, content):
+        self.content = content
+
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeMessage:
+    def __init__(self, state, content: str, author: FakeUser, channel: FakeChannel):
+        self._state = state
+        self.id = random.getrandbits(63)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.attachments = []
+        self.mentions = []
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.edited_at = None
+        self.deleted = False
+
+    async def delete(self):
+        self.deleted = True
+
+
+# Synthetic traffic ------------------------------------------------------------
+
+CHATTER = [
+    'lol that meme is great', 'anyone up for trivia later?', 'this class is so boring',
+    'gg wp everyone', 'the grass is greener on the other side', 'what a shitty day',
+    'check out my new setup', 'climate change is real folks', 'bruh', 'fuuuck this bug',
+]
+KEYWORDS = ['cats', 'dogs', 'memes', 'climate', 'space', 'gaming']
+CITIES = ['London', 'Paris', 'new york', 'Tokyo', 'Amsterdam', 'Nowhereville']
+
+
+def make_command(rng: random.Random, author: FakeUser, users) -> str:
+    choice = rng.random()
+    if choice < 0.20:
+        return rng.choice(['!meme', '!meme funny'])
+    if choice < 0.30:
+        return f'!addmeme https://i.imgur.com/{rng.randrange(10**6)}.jpg'
+    if choice < 0.35:
+        return f'!submitmeme https://i.imgur.com/{rng.randrange(10**6)}.png'
+    if choice < 0.45:
+        return f'!memevote {rng.randint(1, 500)} {rng.choice([1, -1, 0])}'
+    if choice < 0.50:
+        return rng.choice(['!topmeme', '!leaderboard', '!mystats'])
+    if choice < 0.60:
+        return '!CCMeme'
+    if choice < 0.68:
+        return f'!searchmm {rng.choice(KEYWORDS)}'
+    if choice < 0.76:
+        return f'!fact {rng.randint(1, 5)}'
+    if choice < 0.80:
+        return f'!ip 8.8.{rng.randrange(256)}.{rng.randrange(256)}'
+    if choice < 0.84:
+        return f'!password {rng.randint(8, 32)}'
+    if choice < 0.88:
+        return '!hobby'
+    if choice < 0.95:
+        return f'!weather {rng.choice(CITIES)}'
+    return rng.choice(['!ClimateChange', '!hi', '!trivia', '!trivia'])
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_load(bot_module, args) -> dict:
+    from discord.ext import commands
+
+    bot = bot_module.bot
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+
+    class BenchContext(commands.Context):
+        async def send(self, content=None, **kwargs):
+            return await self.channel.send(content, **kwargs)
+
+    async def process_commands(message):
+        if message.author.bot:
+            return
+        ctx = await bot.get_context(message, cls=BenchContext)
+        name = ctx.command.qualified_name if ctx.command else 'chat'
+        started = time.perf_counter()
+        try:
+            await bot.invoke(ctx)
+        except Exception:
+            failures[name] += 1
+        latencies[name].append(time.perf_counter() - started)
+
+    # Route on_message's process_commands call through the fake context
+    bot.process_commands = process_commands
+    bot._connection.user = FakeUser(1, bot=True)
+    # Normally set by login(); error/cooldown dispatch schedules on it
+    bot.loop = asyncio.get_running_loop()
+    on_message = bot_module.on_message
+
+    rng = random.Random(args.seed)
+    guilds = [FakeGuild(1000 + i) for i in range(args.guilds)]
+    channels = [FakeChannel(2000 + i, rng.choice(guilds)) for i in range(args.guilds * 3)]
+    users = [FakeUser(10_000 + i) for i in range(args.users)]
+    messages = []
+    for _ in range(args.messages):
+        author = rng.choice(users)
+        content = make_command(rng, author, users) if rng.random() < args.command_ratio else rng.choice(CHATTER)
+        messages.append(FakeMessage(bot._connection, content, author, rng.choice(channels)))
+
+    await bot.setup_hook()
+    await asyncio.sleep(args.warmup)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    message_latencies = []
+
+    async def deliver(message):
+        async with semaphore:
+            started = time.perf_counter()
+            await on_message(message)
+            message_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver(message) for message in messages))
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for loop_task in (bot_module.prewarm_meme_cache, bot_module.measure_loop_lag):
+        loop_task.cancel()
+    bot_module.scheduler.stop()
+    await bot_module.http_client.close()
+    await bot_module.storage.close()
+
+    return {
+        'messages': len(messages),
+        'elapsed_s': elapsed,
+        'messages_per_s': len(messages) / elapsed,
+        'message_p50_ms': percentile(message_latencies, 0.50) * 1000,
+        'message_p99_ms': percentile(message_latencies, 0.99) * 1000,
+        'memory_growth_mb': (current - baseline) / 2**20,
+        'memory_peak_mb': (peak - baseline) / 2**20,
+        'replies': sum(channel.sent for channel in channels),
+        'commands': {
+            name: {
+                'count': len(values),
+                'failures': failures[name],
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+            for name, values in sorted(latencies.items())
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['messages']:,} messages in {report['elapsed_s']:.2f}s "
+          f"-> {report['messages_per_s']:,.0f} msg/s")
+    print(f"per message: p50 {report['message_p50_ms']:.2f}ms  p99 {report['message_p99_ms']:.2f}ms")
+    print(f"memory growth: {report['memory_growth_mb']:.2f} MiB (peak {report['memory_peak_mb']:.2f} MiB), "
+          f"{report['replies']:,} replies sent")
+    print(f"{'command':<16}{'count':>8}{'failed':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in report['commands'].items():
+        print(f"{name:<16}{stats['count']:>8}{stats['failures']:>8}"
+              f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+
+def check_thresholds(report: dict, args) -> list:
+    failures = []
+    if args.min_throughput and report['messages_per_s'] < args.min_throughput:
+        failures.append(f"throughput {report['messages_per_s']:.0f} msg/s < {args.min_throughput}")
+    if args.max_p99_ms and report['message_p99_ms'] > args.max_p99_ms:
+        failures.append(f"p99 {report['message_p99_ms']:.1f}ms > {args.max_p99_ms}ms")
+    if args.max_memory_growth_mb and report['memory_growth_mb'] > args.max_memory_growth_mb:
+        failures.append(f"memory growth {report['memory_growth_mb']:.1f} MiB > {args.max_memory_growth_mb} MiB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test for the meme bot.')
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--guilds', type=int, default=5)
+    parser.add_argument('--command-ratio', type=float, default=0.6, help='share of messages that are commands')
+    parser.add_argument('--upstream-latency-ms', type=float, default=50)
+    parser.add_argument('--upstream-jitter-ms', type=float, default=20)
+    parser.add_argument('--upstream-error-rate', type=float, default=0.02)
+    parser.add_argument('--warmup', type=float, default=1.0, help='seconds to let background prefetchers run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--min-throughput', type=float, default=0)
+    parser.add_argument('--max-p99-ms', type=float, default=0)
+    parser.add_argument('--max-memory-growth-mb', type=float, default=0)
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = multiprocessing.Process(
+        target=run_stub_server,
+        args=(port, args.upstream_latency_ms / 1000, args.upstream_jitter_ms / 1000,
+              args.upstream_error_rate, args.seed),
+        daemon=True,
+    )
+    stub.start()
+    try:
+        wait_for_port(port)
+        base = f'http://127.0.0.1:{port}'
+        for name, value in {
+            'IMGUR_CLIENT_ID': 'bench', 'API_NINJAS_KEY': 'bench', 'BOT_TOKEN': 'bench',
+            'IMGUR_API_BASE': base, 'NINJAS_API_BASE': base, 'WEATHER_API_BASE': base,
+            'DB_FILE': ':memory:', 'IMGUR_RATE': '1000', 'IMGUR_BURST': '1000',
+            'NINJAS_RATE': '1000', 'NINJAS_BURST': '1000', 'METRICS_PORT': '0',
+        }.items():
+            os.environ.setdefault(name, value)
+
+        # The bot logs at LOG_LEVEL (INFO by default) on import, and refills,
+        # deadlines and cooldowns log warnings under load; keep the report readable
+        logging.disable(logging.ERROR)
+        import bot as bot_module
+
+        report = asyncio.run(run_load(bot_module, args))
+    finally:
+        stub.terminate()
+        stub.join()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failures = check_thresholds(report, args)
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# Memory benchmark for the in-RAM meme collection.
+#
+#   python bench/meme_store_bench.py [--sizes 100000 1000000] [--repost-rate 0.2]
+#
+# Loads the same synthetic rows into the old representation (per-user lists
+# of URL strings plus the random-pick pools built over them) and into
+# MemeStore, and reports the bytes each one holds per meme plus MemeStore
+# lookup times. URLs are built fresh per row, the way rows come back from
+# SQLite or JSON, so reposted links are separate string objects unless
+# something deduplicates them.
+import argparse
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+for name in ('IMGUR_CLIENT_ID', 'API_NINJAS_KEY', 'BOT_TOKEN'):
+    os.environ.setdefault(name, 'bench')
+os.environ.setdefault('DB_FILE', ':memory:')
+
+import bot  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def build_rows(count: int, users: int, repost_rate: float, seed: int = 42):
+    rng = random.Random(seed)
+    images = []
+    rows = []
+    for meme_id in range(1, count + 1):
+        if images and rng.random() < repost_rate:
+            image = rng.choice(images)
+        else:
+            image = f'{rng.getrandbits(40):010x}'
+            images.append(image)
+        owner = str(rng.randrange(10**17, 10**17 + users))
+        rows.append((meme_id, owner, ''.join(['https://i.imgur.com/', image, '.jpg']), 1.7e9 + meme_id, None))
+    return rows
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+# tracemalloc slows allocation down a lot, so load times are taken separately
+def timed(build):
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    return time.perf_counter() - started
+
+
+# What the bot kept per user meme before MemeStore: the user_memes lists plus
+# the MemeIndex user pools (one shared, one per user) and its location map
+def legacy(rows):
+    user_memes = {}
+    user_pool = bot.MemePool()
+    user_pools = {}
+    locations = {}
+    next_id = 0
+    for _, owner, url, _, _ in rows:
+        next_id += 1
+        user_memes.setdefault(owner, []).append(url)
+        user_pool.add(next_id, url)
+        user_pools.setdefault(owner, bot.MemePool()).add(next_id, url)
+        locations[next_id] = ('user', owner)
+    return user_memes, user_pool, user_pools, locations
+
+
+def compact(rows):
+    store = bot.MemeStore()
+    store.load(rows)
+    return store
+
+
+def fresh_rows(rows):
+    # Copy the URLs so neither side shares string objects with the input
+    return [(meme_id, owner, ''.join([url[:8], url[8:]]), created_at, url_key)
+            for meme_id, owner, url, created_at, url_key in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--users', type=int, default=5_000)
+    parser.add_argument('--repost-rate', type=float, default=0.2)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'memes':>10} {'legacy B/meme':>14} {'store B/meme':>13} {'saved':>7} "
+          f"{'legacy load s':>14} {'store load s':>13} {'lookup us':>10}")
+    for size in args.sizes:
+        rows = build_rows(size, args.users, args.repost_rate)
+        # The copied rows are freed before the snapshot is taken, so only what
+        # each structure keeps alive is counted
+        old, old_bytes = measure(lambda: legacy(fresh_rows(rows)))
+        del old
+        store, new_bytes = measure(lambda: compact(fresh_rows(rows)))
+        old_load = timed(lambda: legacy(rows))
+        new_load = timed(lambda: compact(rows))
+        rng = random.Random(1)
+        ids = [rng.randint(1, size) for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for meme_id in ids:
+            store.owner(meme_id)
+            store.url(meme_id)
+        lookup = (time.perf_counter() - started) / args.lookups * 1e6
+        print(f"{size:>10,} {old_bytes / size:>14.1f} {new_bytes / size:>13.1f} {1 - new_bytes / old_bytes:>7.0%} "
+              f"{old_load:>14.2f} {new_load:>13.2f} {lookup:>10.2f}")
+        del store, rows
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Microbenchmark for the on_message profanity filter.
+#
+#   python bench/profanity_bench.py [--messages 200000]
+#
+# Compares the compiled filter with the old per-word substring scan on a
+# synthetic chat corpus and reports messages/sec plus how many innocent
+# messages each approach flags.
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+for name in ('IMGUR_CLIENT_ID', 'API_NINJAS_KEY', 'BOT_TOKEN'):
+    os.environ.setdefault(name, 'bench')
+os.environ.setdefault('DB_FILE', ':memory:')
+
+import bot  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+VOCABULARY = (
+    "the a to and of is it you that in was for on are with as i his they be at one have this from "
+    "or had by word but what some we can out other were all there when up use your how said an each "
+    "meme memes lol lmao bruh based cringe vibe server channel class assume passage grass bass "
+    "classic glass massive assignment shitake cocktail scunthorpe analysis hello thanks gg wp "
+    "climate weather trivia vote leaderboard discord bot 😂 🔥 👍 café naïve résumé"
+).split()
+PROFANE = ['fuck', 'sh1t', 'b!tch', 'fuuuuck', 'STFU', 'a$$', 'ѕhit', 'fúck', 'shitty', 'asses']
+OLD_WORDS = ['stfu', 'fuck', 'shit', 'bitch', 'nigga', 'nigger', 'ass', 'mtf']
+
+
+def build_corpus(count: int, profanity_rate: float, seed: int = 42):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        words = rng.choices(VOCABULARY, k=rng.randint(3, 25))
+        dirty = rng.random() < profanity_rate
+        if dirty:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(PROFANE))
+        corpus.append((' '.join(words), dirty))
+    return corpus
+
+
+def old_filter(text: str) -> bool:
+    return any(bad_word in text.lower() for bad_word in OLD_WORDS)
+
+
+def run(name, check, corpus):
+    started = time.perf_counter()
+    flagged = [check(text) for text, _ in corpus]
+    elapsed = time.perf_counter() - started
+    false_positives = sum(1 for hit, (_, dirty) in zip(flagged, corpus) if hit and not dirty)
+    missed = sum(1 for hit, (_, dirty) in zip(flagged, corpus) if dirty and not hit)
+    print(f"{name:<10} {len(corpus) / elapsed:>12,.0f} msg/s   "
+          f"false positives: {false_positives:>6}   missed: {missed:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--profanity-rate', type=float, default=0.02)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.profanity_rate)
+    guild_filter = bot.ProfanityFilter(bot.DEFAULT_BAD_WORDS)
+    guild_filter.set_guild_words(1, ['heck', 'darn', 'frick'])
+
+    print(f"{args.messages:,} messages, {args.profanity_rate:.0%} profane")
+    run('substring', old_filter, corpus)
+    run('compiled', bot.profanity_filter.contains_profanity, corpus)
+    run('per-guild', lambda text: guild_filter.contains_profanity(text, 1), corpus)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,57 +1,1835 @@
 import asyncio
+import atexit
 import aiohttp
+from aiohttp import web
 import discord
 from discord import Member, User, Role, Guild
 from discord.ext import commands, tasks
 from discord.ext.commands import has_permissions, MissingPermissions
 import random
-import requests
+import bisect
+from array import array
+import heapq
 import logging
+import logging.handlers
+import hashlib
 import json
 import os
+import queue
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import unicodedata
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit, urlunsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Iterator, NamedTuple, Optional
 
 load_dotenv()
 
-logging.basicConfig(level=logging.DEBUG)  # or INFO
+# Logging: handlers only enqueue records; a listener thread formats and writes
+# them, so log I/O never runs on the event loop. LOG_LEVELS sets per-logger
+# levels, e.g. "discord.gateway=WARNING,__main__.upstream=DEBUG".
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', 'discord=INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_FILE = os.getenv('LOG_FILE', '')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '20'))
+LOG_RATE_WINDOW = float(os.getenv('LOG_RATE_WINDOW', '10'))
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+
+def parse_log_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for part in spec.split(','):
+        name, _, level = part.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+class JSONFormatter(logging.Formatter):
+    RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        entry.update((key, value) for key, value in vars(record).items() if key not in self.RESERVED)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+# A full queue drops the record instead of blocking the caller
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# Caps each call site at `rate` records per `window` seconds and reports what it
+# suppressed on the next record that gets through. Below WARNING, records are
+# additionally sampled at `sample_rate`.
+class LogThrottle(logging.Filter):
+    def __init__(self, rate: int = LOG_RATE_LIMIT, window: float = LOG_RATE_WINDOW, sample_rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.window = window
+        self.sample_rate = sample_rate
+        self._sites: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or record.created - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                site = self._sites[key] = [record.created, 0, 0]
+                if suppressed:
+                    record.msg = f'{record.getMessage()} ({suppressed} similar suppressed)'
+                    record.args = None
+            site[1] += 1
+            if site[1] > self.rate:
+                site[2] += 1
+                return False
+        return True
+
+def setup_logging() -> DroppingQueueHandler:
+    output = logging.FileHandler(LOG_FILE, encoding='utf-8') if LOG_FILE else logging.StreamHandler()
+    output.setFormatter(JSONFormatter() if LOG_FORMAT == 'json' else logging.Formatter(logging.BASIC_FORMAT))
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(LogThrottle())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_log_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return handler
+
+log_handler = setup_logging()
 logger = logging.getLogger(__name__)
+# Hot paths (upstream helpers, gateway events) are sampled below WARNING
+upstream_logger = logger.getChild('upstream')
+upstream_logger.addFilter(LogThrottle(sample_rate=LOG_SAMPLE_RATE))
+events_logger = logger.getChild('events')
+events_logger.addFilter(LogThrottle(sample_rate=LOG_SAMPLE_RATE))
 
 intents = discord.Intents.default()
 intents.message_content = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
-
 IMGUR_CLIENT_ID = os.getenv('IMGUR_CLIENT_ID')
 API_NINJAS_KEY = os.getenv('API_NINJAS_KEY')
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 
-WELCOME_CHANNEL_ID = None
-GOODBYE_CHANNEL_ID = None
-FEEDBACK_CHANNEL_ID = None
-
 headers = {'Authorization': f'Client-ID {IMGUR_CLIENT_ID}'}
 
+# HTTP client settings for upstream APIs (Imgur, API Ninjas)
+HTTP_TOTAL_TIMEOUT = float(os.getenv('HTTP_TOTAL_TIMEOUT', '10'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_LIMIT = int(os.getenv('HTTP_LIMIT', '100'))
+HTTP_LIMIT_PER_HOST = int(os.getenv('HTTP_LIMIT_PER_HOST', '10'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+
+# Upstream base URLs, overridable to point the bot at stub servers
+IMGUR_API_BASE = os.getenv('IMGUR_API_BASE', 'https://api.imgur.com')
+NINJAS_API_BASE = os.getenv('NINJAS_API_BASE', 'https://api.api-ninjas.com')
+WEATHER_API_BASE = os.getenv('WEATHER_API_BASE', 'http://api.weatherapi.com')
+
+# Client-side rate limits per upstream host (requests/second, burst size)
+RATE_LIMITS = {
+    urlsplit(IMGUR_API_BASE).netloc: (float(os.getenv('IMGUR_RATE', '1')), int(os.getenv('IMGUR_BURST', '10'))),
+    urlsplit(NINJAS_API_BASE).netloc: (float(os.getenv('NINJAS_RATE', '5')), int(os.getenv('NINJAS_BURST', '10'))),
+}
+HTTP_MAX_QUEUE_WAIT = float(os.getenv('HTTP_MAX_QUEUE_WAIT', '5'))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+HTTP_RETRY_BASE = float(os.getenv('HTTP_RETRY_BASE', '0.5'))
+
 if not all([IMGUR_CLIENT_ID, API_NINJAS_KEY, BOT_TOKEN]):
     raise ValueError("Required environment variables are missing.")
 
 DATA_FILE = 'bot_data.json'
+DB_FILE = os.getenv('DB_FILE', 'bot_data.db')
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+JSON_FLUSH_INTERVAL_MS = int(os.getenv('JSON_FLUSH_INTERVAL_MS', '500'))
+JSON_FLUSH_MAX_MUTATIONS = int(os.getenv('JSON_FLUSH_MAX_MUTATIONS', '50'))
+
+# Sharding: an empty SHARD_COUNT runs a single unsharded bot, 'auto' lets Discord
+# pick the shard count, a number fixes it. SHARD_PROCESSES > 1 splits the shards
+# across worker processes; each worker gets its range through SHARD_IDS.
+SHARD_COUNT = os.getenv('SHARD_COUNT', '')
+SHARD_IDS = os.getenv('SHARD_IDS', '')
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', '1'))
+SHARD_WORKER_RESTART_DELAY = float(os.getenv('SHARD_WORKER_RESTART_DELAY', '5'))
+SHARED_STATE_SYNC_INTERVAL = float(os.getenv('SHARED_STATE_SYNC_INTERVAL', '2'))
+# Vote log entries kept for processes catching up; one further behind reloads in full
+VOTE_LOG_KEEP = int(os.getenv('VOTE_LOG_KEEP', '100000'))
+
+def parse_shard_ids(spec: str) -> Optional[List[int]]:
+    if not spec:
+        return None
+    shards = set()
+    for part in spec.split(','):
+        start, _, end = part.strip().partition('-')
+        shards.update(range(int(start), int(end or start) + 1))
+    return sorted(shards)
+
+shard_ids = parse_shard_ids(SHARD_IDS)
+shard_count = int(SHARD_COUNT) if SHARD_COUNT.isdigit() else None
+if shard_ids is not None and shard_count is None:
+    raise ValueError("SHARD_IDS requires a numeric SHARD_COUNT.")
+
+# With only part of the shards in this process, other processes write to the
+# same database, so the in-memory state has to be re-synced from it
+SHARED_STATE = shard_ids is not None
+if (SHARED_STATE or SHARD_PROCESSES > 1) and STORAGE_BACKEND != 'sqlite':
+    raise ValueError("Running shards in several processes requires STORAGE_BACKEND=sqlite.")
+
+# Discord routes a guild to shard (guild_id >> 22) % shard_count
+def owns_guild(guild_id) -> bool:
+    return shard_ids is None or (int(guild_id) >> 22) % shard_count in shard_ids
+
+# Canonical meme URLs, the keys duplicates are found by. Storage uses them too,
+# to key memes stored before URL keys existed.
+MEME_URL_MAX_LENGTH = 2048
+TRACKING_PARAMS = frozenset(['fbclid', 'gclid', 'igshid', 'si', 'ref', 'ref_src', 'mc_cid', 'mc_eid'])
+IMGUR_HOSTS = frozenset(['imgur.com', 'i.imgur.com', 'm.imgur.com'])
+IMGUR_ANIMATED = frozenset(['gif', 'gifv', 'mp4', 'webm'])
+# Imgur image IDs are 5 or 7 characters; imgur.com also has site pages that short
+IMGUR_ID = re.compile(r'[A-Za-z0-9]{5}|[A-Za-z0-9]{7}')
+IMGUR_PAGES = frozenset(['about', 'apps', 'emerald', 'privacy', 'random', 'rules', 'signin', 'upload'])
+DISCORD_CDN_HOSTS = frozenset(['cdn.discordapp.com', 'media.discordapp.net'])
+
+# Imgur serves any still as .jpg and any animation as .mp4, so one image ID maps
+# to one key whatever extension or host it was posted with. Discord CDN keys
+# drop the expiring signature (the stored link keeps it). Everything else gets a lower-case host without
+# www., no fragment, no trailing slash and a sorted query without tracking tags.
+def canonicalize_url(url: str) -> Optional[str]:
+    url = url.strip().strip('<>')
+    if len(url) > MEME_URL_MAX_LENGTH:
+        return None
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if scheme not in ('http', 'https') or not host or ' ' in url:
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if host in IMGUR_HOSTS:
+        if len(segments) == 1:
+            image_id, _, extension = segments[0].partition('.')
+            if IMGUR_ID.fullmatch(image_id) and (extension or image_id.lower() not in IMGUR_PAGES):
+                return f"https://i.imgur.com/{image_id}.{'mp4' if extension.lower() in IMGUR_ANIMATED else 'jpg'}"
+        elif len(segments) == 2 and segments[0] in ('a', 'gallery'):
+            return f"https://imgur.com/{segments[0]}/{segments[1]}"
+    if host in DISCORD_CDN_HOSTS:
+        return urlunsplit(('https', 'cdn.discordapp.com', parts.path, '', ''))
+    if port and port != {'http': 80, 'https': 443}[scheme]:
+        host = f'{host}:{port}'
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')))
+    return urlunsplit((scheme, host, '/' + '/'.join(segments) if segments else '/', query, ''))
+
+# Other spellings of a canonical key for the same media: the other scheme, or for
+# Imgur the other extension, since an extension-less link can't tell a still from an animation
+def url_variants(url: str) -> List[str]:
+    if url.startswith('https://i.imgur.com/'):
+        return [url, url[:-3] + ('mp4' if url.endswith('.jpg') else 'jpg')]
+    scheme, _, rest = url.partition('://')
+    return [url, f"{'http' if scheme == 'https' else 'https'}://{rest}"]
+
+# What storage keeps as a meme's URL key: None when it is the URL itself
+def stored_url_key(url: str) -> Optional[str]:
+    key = canonicalize_url(url)
+    return key if key and key != url else None
+
+# Persistence backends. Mutations run on a single storage thread so the
+# event loop never blocks on disk I/O and writes stay ordered.
+class Storage(ABC):
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+        # Bumped whenever a write is queued, so readers can tell they raced one
+        self.generation = 0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _write(self, fn, *args):
+        self.generation += 1
+        return await self._run(fn, *args)
+
+    @abstractmethod
+    def load(self) -> Dict:
+        ...
+
+    # Returns the new meme's ID; content_hash is the hex digest of the media, if
+    # known, and url_key the canonical URL duplicates are found by, if not the URL
+    @abstractmethod
+    async def add_meme(self, user_id: str, url: str, created_at: float, content_hash: Optional[str] = None,
+                       url_key: Optional[str] = None) -> int:
+        ...
+
+    # Records (or replaces) one voter's vote on a meme and adds the change to the owner's total
+    @abstractmethod
+    async def cast_vote(self, meme_id: int, voter_id: int, value: int) -> None:
+        ...
+
+    @abstractmethod
+    async def reset_votes(self) -> None:
+        ...
+
+    @abstractmethod
+    async def reset_all(self) -> None:
+        ...
+
+    @abstractmethod
+    async def set_word_list(self, guild_id: str, words: List[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def add_timer(self, timer: Dict) -> None:
+        ...
+
+    @abstractmethod
+    async def remove_timer(self, timer_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def add_trivia_point(self, guild_id: str, user_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def load_guild_config(self, guild_id: str) -> Dict:
+        ...
+
+    @abstractmethod
+    async def set_guild_config(self, guild_id: str, key: str, value) -> None:
+        ...
+
+    # What another process changed since the cursor returned with the last
+    # load, or None if nothing did
+    async def load_changes(self, cursor: Optional[Dict], force: bool = False) -> Optional[Dict]:
+        return None
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+class JSONStorage(Storage):
+    def __init__(self, path: str, flush_interval: float = JSON_FLUSH_INTERVAL_MS / 1000,
+                 flush_max_mutations: int = JSON_FLUSH_MAX_MUTATIONS):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_max_mutations = flush_max_mutations
+        self._dirty = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes = set()
+        self._flush_scheduled = False
+        self.guild_configs: Dict[str, Dict] = {}
+        self._next_meme_id = 1
+
+    def load(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {'memes': [], 'votes': {}}
+        # Files written before meme IDs existed get IDs in file order
+        now = time.time()
+        if 'memes' not in data:
+            data['memes'] = [[meme_id, str(user_id), url] for meme_id, (user_id, url) in enumerate(
+                ((user_id, url) for user_id, memes in data.get('user_memes', {}).items() for url in memes), 1)]
+        # Rows written before URL keys existed get theirs; later rows store None
+        # only when the key is the URL itself
+        for row in data['memes']:
+            if len(row) < 4:
+                row.append(now)
+            if len(row) < 5:
+                row.append(stored_url_key(row[2]))
+        data.setdefault('meme_votes', [])
+        data.setdefault('meme_hashes', [])
+        self._next_meme_id = max((row[0] for row in data['memes']), default=0) + 1
+        # Guild settings are read per guild, so this backend keeps them itself
+        self.guild_configs = data.get('guild_config', {})
+        return data
+
+    # Write to a temp file and rename it over the original so a crash never truncates it
+    def _save(self, data: Dict) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    # Write-behind: mutations only mark the state dirty, flushes are batched
+    def _mark_dirty(self) -> None:
+        self._dirty += 1
+        if self._dirty >= self.flush_max_mutations and not self._flush_scheduled:
+            self._flush_scheduled = True
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._dirty:
+            return
+        batched, self._dirty = self._dirty, 0
+        started = time.monotonic()
+        try:
+            data = snapshot_data()
+            data['guild_config'] = {guild_id: dict(config) for guild_id, config in self.guild_configs.items()}
+            await self._run(self._save, data)
+        except Exception as e:
+            self._dirty += batched
+            logger.error(f"Failed to flush {self.path}: {e}")
+            return
+        elapsed = time.monotonic() - started
+        metrics.observe('bot_storage_flush_duration_seconds', elapsed)
+        metrics.inc('bot_storage_flushed_mutations_total', batched)
+        logger.debug(f"💾 Flushed {batched} mutations to {self.path} in {elapsed * 1000:.1f}ms")
+
+    async def add_meme(self, user_id: str, url: str, created_at: float, content_hash: Optional[str] = None,
+                       url_key: Optional[str] = None) -> int:
+        meme_id = self._next_meme_id
+        self._next_meme_id += 1
+        self._mark_dirty()
+        return meme_id
+
+    async def cast_vote(self, meme_id: int, voter_id: int, value: int) -> None:
+        self._mark_dirty()
+
+    async def reset_votes(self) -> None:
+        self._mark_dirty()
+
+    async def reset_all(self) -> None:
+        self._mark_dirty()
+
+    async def set_word_list(self, guild_id: str, words: List[str]) -> None:
+        self._mark_dirty()
+
+    async def add_timer(self, timer: Dict) -> None:
+        self._mark_dirty()
+
+    async def remove_timer(self, timer_id: str) -> None:
+        self._mark_dirty()
+
+    async def add_trivia_point(self, guild_id: str, user_id: str) -> None:
+        self._mark_dirty()
+
+    async def load_guild_config(self, guild_id: str) -> Dict:
+        return dict(self.guild_configs.get(guild_id, {}))
+
+    async def set_guild_config(self, guild_id: str, key: str, value) -> None:
+        self.guild_configs.setdefault(guild_id, {})[key] = value
+        self._mark_dirty()
+
+    async def close(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+        await super().close()
+
+class SQLiteStorage(Storage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS memes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            url_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_memes_user ON memes (user_id);
+        CREATE TABLE IF NOT EXISTS votes (
+            user_id TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_votes_total ON votes (total);
+        CREATE TABLE IF NOT EXISTS meme_votes (
+            meme_id INTEGER NOT NULL,
+            voter_id INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (meme_id, voter_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meme_hashes (
+            digest BLOB PRIMARY KEY,
+            meme_id INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_meme_hashes_meme ON meme_hashes (meme_id);
+        CREATE TABLE IF NOT EXISTS vote_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            meme_id INTEGER NOT NULL,
+            voter_id INTEGER NOT NULL,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS bad_words (
+            guild_id TEXT NOT NULL,
+            word TEXT NOT NULL,
+            PRIMARY KEY (guild_id, word)
+        );
+        CREATE TABLE IF NOT EXISTS timers (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            due_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_timers_due ON timers (due_at);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS trivia_scores (
+            guild_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            score INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (guild_id, key)
+        );
+    """
+
+    def __init__(self, path: str, json_path: Optional[str] = None):
+        super().__init__()
+        self.path = path
+        self.json_path = json_path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate_columns()
+        self._conn.executescript(self.SCHEMA)
+        self._migrate_json()
+        self._migrate_url_keys()
+        self._data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    # Columns added after a table was first created
+    def _migrate_columns(self) -> None:
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(memes)')}
+        if columns and 'url_key' not in columns:
+            self._conn.execute('ALTER TABLE memes ADD COLUMN url_key TEXT')
+
+    def _migrate_json(self) -> None:
+        if not self.json_path or not os.path.exists(self.json_path):
+            return
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        legacy = JSONStorage(self.json_path).load()
+        now = time.time()
+        with self._transaction():
+            self._insert_memes(legacy, now)
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO votes (user_id, total) VALUES (?, ?)',
+                [(str(user_id), int(total)) for user_id, total in legacy.get('votes', {}).items()],
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO trivia_scores (guild_id, user_id, score) VALUES (?, ?, ?)',
+                [(str(guild_id), str(user_id), int(score))
+                 for guild_id, scores in legacy.get('trivia_scores', {}).items() for user_id, score in scores.items()],
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO guild_config (guild_id, key, value) VALUES (?, ?, ?)',
+                [(str(guild_id), key, json.dumps(value))
+                 for guild_id, config in legacy.get('guild_config', {}).items() for key, value in config.items()],
+            )
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(now),))
+        logger.info(f"📦 Migrated {self.json_path} into {self.path}.")
+
+    # Memes stored before URL keys existed (including ones imported from the
+    # JSON file) get theirs once; other processes then reload in full
+    def _migrate_url_keys(self) -> None:
+        with self._transaction():
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'url_keys_backfilled'").fetchone():
+                return
+            rows = self._conn.execute('SELECT id, url FROM memes WHERE url_key IS NULL').fetchall()
+            keys = [(key, meme_id) for meme_id, url in rows for key in [stored_url_key(url)] if key]
+            self._conn.executemany('UPDATE memes SET url_key = ? WHERE id = ?', keys)
+            if keys:
+                self._bump_epoch()
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('url_keys_backfilled', ?)", (str(time.time()),))
+        if keys:
+            logger.info(f"🔑 Backfilled URL keys for {len(keys)} memes.")
+
+    def _transaction(self):
+        return _SQLiteTransaction(self._conn)
+
+    # A read transaction, so a multi-table read sees one consistent state
+    def _snapshot(self):
+        return _SQLiteTransaction(self._conn, 'BEGIN')
+
+    # How far a load has read: the reset epoch, the last meme ID and the last
+    # vote log entry
+    def _cursor(self) -> Dict:
+        epoch = self._conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()
+        meme = self._conn.execute('SELECT max(id) FROM memes').fetchone()[0]
+        vote = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'vote_log'").fetchone()
+        return {'epoch': int(epoch[0]) if epoch else 0, 'meme': meme or 0, 'vote': vote[0] if vote else 0}
+
+    # Resets rewrite the tables wholesale, so other processes reload in full
+    def _bump_epoch(self) -> None:
+        self._conn.execute('DELETE FROM vote_log')
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('epoch', '1') "
+                           "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    # Memes keep their IDs so the vote ledger still points at them
+    def _insert_memes(self, data: Dict, now: float) -> None:
+        if 'memes' in data:
+            self._conn.executemany(
+                'INSERT INTO memes (id, user_id, url, created_at, url_key) VALUES (?, ?, ?, ?, ?)',
+                [(int(row[0]), str(row[1]), row[2], row[3] if len(row) > 3 else now, row[4] if len(row) > 4 else None)
+                 for row in data['memes']],
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO meme_votes (meme_id, voter_id, value) VALUES (?, ?, ?)',
+                [(int(meme_id), int(voter_id), int(value)) for meme_id, voter_id, value in data.get('meme_votes', [])],
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO meme_hashes (digest, meme_id) VALUES (?, ?)',
+                [(bytes.fromhex(digest), int(meme_id)) for digest, meme_id in data.get('meme_hashes', [])],
+            )
+            return
+        for user_id, memes in data.get('user_memes', {}).items():
+            self._conn.executemany(
+                'INSERT INTO memes (user_id, url, created_at) VALUES (?, ?, ?)',
+                [(str(user_id), url, now) for url in memes],
+            )
+
+    def load(self) -> Dict:
+        with self._snapshot():
+            return self._load()
+
+    def _load(self) -> Dict:
+        memes = self._conn.execute('SELECT id, user_id, url, created_at, url_key FROM memes ORDER BY id').fetchall()
+        meme_votes = self._conn.execute('SELECT meme_id, voter_id, value FROM meme_votes').fetchall()
+        meme_hashes = self._conn.execute('SELECT lower(hex(digest)), meme_id FROM meme_hashes').fetchall()
+        votes = dict(self._conn.execute('SELECT user_id, total FROM votes'))
+        bad_words: Dict[str, List[str]] = {}
+        for guild_id, word in self._conn.execute('SELECT guild_id, word FROM bad_words'):
+            bad_words.setdefault(guild_id, []).append(word)
+        timers = [
+            {'id': timer_id, 'kind': kind, 'due_at': due_at, 'payload': json.loads(payload)}
+            for timer_id, kind, due_at, payload in self._conn.execute('SELECT id, kind, due_at, payload FROM timers')
+        ]
+        trivia_scores: Dict[str, Dict[str, int]] = {}
+        for guild_id, user_id, score in self._conn.execute('SELECT guild_id, user_id, score FROM trivia_scores'):
+            trivia_scores.setdefault(guild_id, {})[user_id] = score
+        return {'memes': memes, 'meme_votes': meme_votes, 'meme_hashes': meme_hashes, 'votes': votes,
+                'bad_words': bad_words, 'timers': timers, 'trivia_scores': trivia_scores, 'cursor': self._cursor()}
+
+    # PRAGMA data_version only moves when another connection commits. Only memes
+    # and votes past the cursor are read; a reset since then, or a cursor older
+    # than the pruned vote log, returns the full state under 'full' instead.
+    # Word lists, trivia scores and guild settings are per guild, and a guild
+    # only ever talks to the process running its shard, so they are not synced.
+    def _load_changes(self, cursor: Optional[Dict], force: bool) -> Optional[Dict]:
+        version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == self._data_version and not force:
+            return None
+        self._data_version = version
+        with self._snapshot():
+            oldest = self._conn.execute('SELECT min(seq) FROM vote_log').fetchone()[0]
+            current = self._cursor()
+            if (cursor is None or current['epoch'] != cursor['epoch']
+                    or (oldest is not None and oldest > cursor['vote'] + 1)):
+                return {'full': self._load()}
+            memes = self._conn.execute(
+                'SELECT id, user_id, url, created_at, url_key FROM memes WHERE id > ? ORDER BY id', (cursor['meme'],)
+            ).fetchall()
+            meme_hashes = self._conn.execute('SELECT lower(hex(digest)), meme_id FROM meme_hashes WHERE meme_id > ?',
+                                             (cursor['meme'],)).fetchall()
+            vote_log = self._conn.execute('SELECT meme_id, voter_id, value FROM vote_log WHERE seq > ? ORDER BY seq',
+                                          (cursor['vote'],)).fetchall()
+        return {'memes': memes, 'meme_hashes': meme_hashes, 'vote_log': vote_log, 'cursor': current}
+
+    def _add_meme(self, user_id: str, url: str, created_at: float, content_hash: Optional[str],
+                  url_key: Optional[str]) -> int:
+        insert = 'INSERT INTO memes (user_id, url, created_at, url_key) VALUES (?, ?, ?, ?)'
+        if not content_hash:
+            return self._conn.execute(insert, (user_id, url, created_at, url_key)).lastrowid
+        with self._transaction():
+            meme_id = self._conn.execute(insert, (user_id, url, created_at, url_key)).lastrowid
+            self._conn.execute('INSERT OR IGNORE INTO meme_hashes (digest, meme_id) VALUES (?, ?)',
+                               (bytes.fromhex(content_hash), meme_id))
+        return meme_id
+
+    # The delta is worked out from the stored vote, so a voter racing another
+    # shard process still moves the owner's total by at most their own ±1
+    def _cast_vote(self, meme_id: int, voter_id: int, value: int) -> None:
+        with self._transaction():
+            owner = self._conn.execute('SELECT user_id FROM memes WHERE id = ?', (meme_id,)).fetchone()
+            if owner is None:
+                return
+            row = self._conn.execute('SELECT value FROM meme_votes WHERE meme_id = ? AND voter_id = ?',
+                                     (meme_id, voter_id)).fetchone()
+            delta = value - (row[0] if row else 0)
+            if not delta:
+                return
+            if value:
+                self._conn.execute('INSERT OR REPLACE INTO meme_votes (meme_id, voter_id, value) VALUES (?, ?, ?)',
+                                   (meme_id, voter_id, value))
+            else:
+                self._conn.execute('DELETE FROM meme_votes WHERE meme_id = ? AND voter_id = ?', (meme_id, voter_id))
+            self._conn.execute(
+                'INSERT INTO votes (user_id, total) VALUES (?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET total = total + excluded.total',
+                (owner[0], delta),
+            )
+            # Other shard processes replay the log instead of reloading every vote
+            seq = self._conn.execute('INSERT INTO vote_log (meme_id, voter_id, value) VALUES (?, ?, ?)',
+                                     (meme_id, voter_id, value)).lastrowid
+            if seq % 1000 == 0:
+                self._conn.execute('DELETE FROM vote_log WHERE seq <= ?', (seq - VOTE_LOG_KEEP,))
+
+    def _reset_votes(self) -> None:
+        with self._transaction():
+            self._bump_epoch()
+            self._conn.execute('DELETE FROM meme_votes')
+            self._conn.execute('DELETE FROM votes')
+
+    def _reset_all(self) -> None:
+        with self._transaction():
+            self._bump_epoch()
+            self._conn.execute('DELETE FROM memes')
+            self._conn.execute('DELETE FROM meme_votes')
+            self._conn.execute('DELETE FROM meme_hashes')
+            self._conn.execute('DELETE FROM votes')
+
+    def _set_word_list(self, guild_id: str, words: List[str]) -> None:
+        with self._transaction():
+            self._conn.execute('DELETE FROM bad_words WHERE guild_id = ?', (guild_id,))
+            self._conn.executemany('INSERT INTO bad_words (guild_id, word) VALUES (?, ?)',
+                                   [(guild_id, word) for word in words])
+
+    def _add_timer(self, timer: Dict) -> None:
+        self._conn.execute(
+            'INSERT OR REPLACE INTO timers (id, kind, due_at, payload) VALUES (?, ?, ?, ?)',
+            (timer['id'], timer['kind'], timer['due_at'], json.dumps(timer['payload'])),
+        )
+
+    def _remove_timer(self, timer_id: str) -> None:
+        self._conn.execute('DELETE FROM timers WHERE id = ?', (timer_id,))
+
+    def _add_trivia_point(self, guild_id: str, user_id: str) -> None:
+        self._conn.execute(
+            'INSERT INTO trivia_scores (guild_id, user_id, score) VALUES (?, ?, 1) '
+            'ON CONFLICT(guild_id, user_id) DO UPDATE SET score = score + 1',
+            (guild_id, user_id),
+        )
+
+    def _load_guild_config(self, guild_id: str) -> Dict:
+        rows = self._conn.execute('SELECT key, value FROM guild_config WHERE guild_id = ?', (guild_id,))
+        return {key: json.loads(value) for key, value in rows}
+
+    def _set_guild_config(self, guild_id: str, key: str, value) -> None:
+        self._conn.execute('INSERT OR REPLACE INTO guild_config (guild_id, key, value) VALUES (?, ?, ?)',
+                           (guild_id, key, json.dumps(value)))
+
+    async def add_meme(self, user_id: str, url: str, created_at: float, content_hash: Optional[str] = None,
+                       url_key: Optional[str] = None) -> int:
+        return await self._write(self._add_meme, user_id, url, created_at, content_hash, url_key)
+
+    async def cast_vote(self, meme_id: int, voter_id: int, value: int) -> None:
+        await self._write(self._cast_vote, meme_id, voter_id, value)
+
+    async def reset_votes(self) -> None:
+        await self._write(self._reset_votes)
+
+    async def reset_all(self) -> None:
+        await self._write(self._reset_all)
+
+    async def set_word_list(self, guild_id: str, words: List[str]) -> None:
+        await self._write(self._set_word_list, guild_id, list(words))
+
+    async def add_timer(self, timer: Dict) -> None:
+        await self._write(self._add_timer, dict(timer))
+
+    async def remove_timer(self, timer_id: str) -> None:
+        await self._write(self._remove_timer, timer_id)
+
+    async def add_trivia_point(self, guild_id: str, user_id: str) -> None:
+        await self._write(self._add_trivia_point, guild_id, user_id)
+
+    async def load_guild_config(self, guild_id: str) -> Dict:
+        return await self._run(self._load_guild_config, guild_id)
+
+    async def set_guild_config(self, guild_id: str, key: str, value) -> None:
+        await self._write(self._set_guild_config, guild_id, key, value)
+
+    async def load_changes(self, cursor: Optional[Dict], force: bool = False) -> Optional[Dict]:
+        return await self._run(self._load_changes, cursor, force)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+        await super().close()
+
+class _SQLiteTransaction:
+    def __init__(self, conn: sqlite3.Connection, begin: str = 'BEGIN IMMEDIATE'):
+        self.conn = conn
+        self.begin = begin
+
+    def __enter__(self):
+        self.conn.execute(self.begin)
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+def create_storage() -> Storage:
+    if STORAGE_BACKEND == 'json':
+        return JSONStorage(DATA_FILE)
+    if STORAGE_BACKEND == 'sqlite':
+        return SQLiteStorage(DB_FILE, json_path=DATA_FILE)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+storage = create_storage()
 
 def load_data() -> Dict:
-    try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {'user_memes': {}, 'votes': {}}
+    return storage.load()
+
+# Point-in-time copy of the in-memory state, safe to serialize off the loop
+def snapshot_data() -> Dict:
+    return {
+        'memes': meme_store.meme_rows(),
+        'meme_hashes': meme_store.hash_rows(),
+        'meme_votes': meme_ledger.vote_rows(),
+        'votes': dict(votes),
+        'bad_words': profanity_filter.word_lists(),
+        'timers': scheduler.snapshot(),
+        'trivia_scores': trivia_games.scores_snapshot(),
+    }
 
-def save_data(data: Dict) -> None:
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f)
+# User IDs are ints everywhere in memory; storage keeps them as text
+def load_votes(data: Dict) -> Dict[int, int]:
+    return {int(user_id): total for user_id, total in data.get('votes', {}).items()}
 
 data = load_data()
-user_memes = data.get('user_memes', {})
-votes = data.get('votes', {})
-announcement_channel_id = None
+votes = load_votes(data)
+
+# The meme collection, stored column-wise: parallel arrays indexed by row hold
+# each meme's ID, owner, creation time (whole seconds) and URL number. Distinct
+# URLs are stored once, UTF-8 encoded back to back in one buffer, and found
+# again through an open-addressing table of URL numbers, which doubles as the
+# duplicate check for submissions. IDs only grow, so lookups bisect the ID column.
+class MemeStore:
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self._ids = array('q')
+        self._owners = array('q')
+        self._created = array('I')
+        self._url_ids = array('I')
+        self._key_ids = array('I')
+        self._by_owner: Dict[int, array] = {}
+        self._blob = bytearray()
+        self._offsets = array('Q', [0])
+        self._slots = array('q', [-1]) * 1024
+        self._url_memes = array('q')
+        self._hashes: Dict[bytes, int] = {}
+
+    # Rows are (ID, owner, URL, created_at, URL key or None); content hashes
+    # come as (hex digest, meme ID) rows
+    def load(self, rows: List, hashes: List = ()) -> None:
+        self.clear()
+        # Size the URL table for the worst case up front instead of rehashing as it fills
+        self._slots = array('q', [-1]) * max(len(self._slots), 1 << (2 * len(rows)).bit_length())
+        for meme_id, owner, url, created_at, url_key in rows:
+            self.add(meme_id, owner, url, created_at, url_key=url_key)
+        for digest, meme_id in hashes:
+            self._hashes[bytes.fromhex(digest)] = meme_id
+
+    # False if the meme is already known, e.g. a shared-state sync loaded it first.
+    # url_key is what find_url matches (the URL itself if None); both strings
+    # live in the same interned blob.
+    def add(self, meme_id: int, owner, url: str, created_at: float, content_hash: Optional[bytes] = None,
+            url_key: Optional[str] = None) -> bool:
+        owner = int(owner)
+        row = len(self._ids)
+        if row and meme_id <= self._ids[-1]:
+            row = bisect.bisect_left(self._ids, meme_id)
+            if self._ids[row] == meme_id:
+                return False
+        self._ids.insert(row, meme_id)
+        self._owners.insert(row, owner)
+        self._created.insert(row, int(created_at))
+        number = self._intern(url)
+        key = number if url_key is None or url_key == url else self._intern(url_key)
+        self._url_ids.insert(row, number)
+        self._key_ids.insert(row, key)
+        first = self._url_memes[key]
+        if first < 0 or meme_id < first:
+            self._url_memes[key] = meme_id
+        owned = self._by_owner.get(owner)
+        if owned is None:
+            owned = self._by_owner[owner] = array('q')
+        owned.insert(bisect.bisect_left(owned, meme_id), meme_id)
+        if content_hash is not None:
+            self._hashes.setdefault(content_hash, meme_id)
+        return True
+
+    # Slot holding this URL's number, or the free slot where it would go
+    def _slot(self, data: bytes) -> int:
+        slots, offsets, blob = self._slots, self._offsets, self._blob
+        mask = len(slots) - 1
+        slot = hash(data) & mask
+        number = slots[slot]
+        while number >= 0 and blob[offsets[number]:offsets[number + 1]] != data:
+            slot = (slot + 1) & mask
+            number = slots[slot]
+        return slot
+
+    def _intern(self, url: str) -> int:
+        data = url.encode()
+        slot = self._slot(data)
+        slots, offsets, blob = self._slots, self._offsets, self._blob
+        number = slots[slot]
+        if number >= 0:
+            return number
+        number = len(offsets) - 1
+        blob += data
+        offsets.append(len(blob))
+        self._url_memes.append(-1)
+        slots[slot] = number
+        # Keep the table at most half full; URLs are distinct, so rehashing only looks for a free slot
+        if 2 * len(offsets) > len(slots):
+            slots = array('q', [-1]) * (2 * len(slots))
+            mask = len(slots) - 1
+            for other in range(number + 1):
+                slot = hash(bytes(blob[offsets[other]:offsets[other + 1]])) & mask
+                while slots[slot] >= 0:
+                    slot = (slot + 1) & mask
+                slots[slot] = other
+            self._slots = slots
+        return number
+
+    def _url(self, number: int) -> str:
+        return self._blob[self._offsets[number]:self._offsets[number + 1]].decode()
+
+    # ID of the oldest meme whose URL key is exactly this
+    def find_url(self, url_key: str) -> Optional[int]:
+        number = self._slots[self._slot(url_key.encode())]
+        meme_id = -1 if number < 0 else self._url_memes[number]
+        return None if meme_id < 0 else meme_id
+
+    def find_content(self, content_hash: bytes) -> Optional[int]:
+        return self._hashes.get(content_hash)
+
+    def _row(self, meme_id: int) -> Optional[int]:
+        row = bisect.bisect_left(self._ids, meme_id)
+        return row if row < len(self._ids) and self._ids[row] == meme_id else None
+
+    def owner(self, meme_id: int) -> Optional[int]:
+        row = self._row(meme_id)
+        return None if row is None else self._owners[row]
+
+    def url(self, meme_id: int) -> Optional[str]:
+        row = self._row(meme_id)
+        return None if row is None else self._url(self._url_ids[row])
+
+    def created_at(self, meme_id: int) -> Optional[int]:
+        row = self._row(meme_id)
+        return None if row is None else self._created[row]
+
+    def memes_of(self, owner: int) -> array:
+        return self._by_owner.get(owner, array('q'))
+
+    def count_of(self, owner: int) -> int:
+        owned = self._by_owner.get(owner)
+        return len(owned) if owned else 0
+
+    def owners(self) -> List[int]:
+        return list(self._by_owner)
+
+    def url_at(self, row: int) -> str:
+        return self._url(self._url_ids[row])
+
+    def random_url_of(self, owner: int) -> Optional[str]:
+        owned = self._by_owner.get(owner)
+        return self.url(random.choice(owned)) if owned else None
+
+    # Each distinct meme URL once
+    def urls(self) -> Iterator[str]:
+        return (self._url(number) for number in dict.fromkeys(self._url_ids))
+
+    def meme_rows(self) -> List[list]:
+        return [[meme_id, str(owner), self._url(number), created_at, None if key == number else self._url(key)]
+                for meme_id, owner, number, created_at, key
+                in zip(self._ids, self._owners, self._url_ids, self._created, self._key_ids)]
+
+    def hash_rows(self) -> List[list]:
+        return [[digest.hex(), meme_id] for digest, meme_id in self._hashes.items()]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+meme_store = MemeStore()
+meme_store.load(data['memes'], data['meme_hashes'])
+
+# Per-guild settings (welcome/goodbye/feedback/announcement channels). A guild's
+# config is read from storage on first use and cached; writes drop the cached copy.
+class GuildConfigStore:
+    def __init__(self):
+        self._cache: Dict[str, Dict] = {}
+
+    async def get(self, guild_id) -> Dict:
+        guild_id = str(guild_id)
+        config = self._cache.get(guild_id)
+        if config is None:
+            generation = storage.generation
+            config = await storage.load_guild_config(guild_id)
+            # Don't cache a read that raced a write to the store
+            if storage.generation == generation:
+                self._cache[guild_id] = config
+        return config
+
+    async def set(self, guild_id, key: str, value) -> None:
+        guild_id = str(guild_id)
+        await storage.set_guild_config(guild_id, key, value)
+        self._cache.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+guild_config = GuildConfigStore()
+
+# Profanity filter: one compiled regex per word set, rebuilt only when a list changes
+DEFAULT_BAD_WORDS = ['stfu', 'fuck', 'shit', 'bitch', 'nigga', 'nigger', 'ass', 'mtf']
+
+# Leetspeak and Cyrillic/Greek look-alikes folded into each letter's character class
+LOOKALIKES = {
+    'a': '4@аα', 'b': '8', 'c': 'с', 'e': '3е', 'g': '9', 'i': '1!|іι', 'k': 'κ',
+    'o': '0оο', 'p': 'р', 's': '5$ѕ', 't': '7+τ', 'v': 'ν', 'x': 'х', 'y': 'у',
+}
+COMBINING_MARKS = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+# Case-fold and strip diacritics ("Fúck" -> "fuck"); ASCII text skips the Unicode work
+def normalize_message(text: str) -> str:
+    text = text.casefold()
+    if not text.isascii():
+        if not unicodedata.is_normalized('NFKD', text):
+            text = unicodedata.normalize('NFKD', text)
+        text = COMBINING_MARKS.sub('', text)
+    return text
+
+def _letter_class(letter: str) -> str:
+    variants = LOOKALIKES.get(letter)
+    if not variants:
+        return re.escape(letter)
+    return '[' + ''.join(re.escape(c) for c in letter + variants) + ']'
+
+# Words that normalize to nothing (e.g. only combining marks) are dropped: an
+# empty alternative would match every message
+def compile_word_pattern(words) -> Optional[re.Pattern]:
+    words = sorted({word for word in (normalize_message(w).strip() for w in words) if word}, key=len, reverse=True)
+    if not words:
+        return None
+    # The pattern opens with one class of every character a word can start
+    # with, so the regex engine skips past all other positions in a C loop
+    # before trying any word; each word then re-checks its own first letter.
+    # Each letter may repeat ("fuuuck") and a few plural/verb endings are allowed.
+    starts = ''.join(sorted({c for word in words for c in word[0] + LOOKALIKES.get(word[0], '')}))
+    alternatives = '|'.join(
+        f'(?<={_letter_class(word[0])}){_letter_class(word[0])}*' + ''.join(_letter_class(c) + '+' for c in word[1:])
+        for word in words)
+    return re.compile(rf'[{re.escape(starts)}](?<!\w.)(?:{alternatives})(?:e?s|ing|ed|ers?|y)?(?!\w)', re.S)
+
+class ProfanityFilter:
+    def __init__(self, default_words: List[str]):
+        self.default_words = list(default_words)
+        self._guild_words: Dict[str, List[str]] = {}
+        self._default_pattern = compile_word_pattern(self.default_words)
+        self._guild_patterns: Dict[str, Optional[re.Pattern]] = {}
+
+    def load(self, word_lists: Dict[str, List[str]]) -> None:
+        self._guild_words = {str(guild_id): list(words) for guild_id, words in word_lists.items()}
+        self._guild_patterns.clear()
+
+    def word_lists(self) -> Dict[str, List[str]]:
+        return {guild_id: list(words) for guild_id, words in self._guild_words.items()}
+
+    def guild_words(self, guild_id) -> List[str]:
+        return list(self._guild_words.get(str(guild_id), []))
+
+    def set_guild_words(self, guild_id, words: List[str]) -> None:
+        guild_id = str(guild_id)
+        self._guild_words[guild_id] = sorted(set(words))
+        self._guild_patterns.pop(guild_id, None)
+
+    def _pattern(self, guild_id) -> Optional[re.Pattern]:
+        if guild_id is None:
+            return self._default_pattern
+        guild_id = str(guild_id)
+        if guild_id not in self._guild_words:
+            return self._default_pattern
+        pattern = self._guild_patterns.get(guild_id)
+        if pattern is None:
+            pattern = compile_word_pattern(self.default_words + self._guild_words[guild_id])
+            self._guild_patterns[guild_id] = pattern
+        return pattern
+
+    def contains_profanity(self, text: str, guild_id=None) -> bool:
+        pattern = self._pattern(guild_id)
+        return bool(pattern and pattern.search(normalize_message(text)))
+
+profanity_filter = ProfanityFilter(DEFAULT_BAD_WORDS)
+profanity_filter.load(data.get('bad_words', {}))
+
+# Persistent timers: one heap of due times served by a single wakeup task.
+# A handler that raises is retried after TIMER_RETRY_BASE seconds, doubling up
+# to TIMER_RETRY_MAX, at most TIMER_MAX_RETRIES times before the timer is dropped.
+TIMER_RETRY_BASE = float(os.getenv('TIMER_RETRY_BASE', '30'))
+TIMER_RETRY_MAX = float(os.getenv('TIMER_RETRY_MAX', '3600'))
+TIMER_MAX_RETRIES = int(os.getenv('TIMER_MAX_RETRIES', '8'))
+
+class Scheduler:
+    def __init__(self):
+        self._timers: Dict[str, Dict] = {}
+        self._heap: List[tuple] = []
+        self._handlers: Dict[str, Callable] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = set()
+
+    def handler(self, kind: str):
+        def decorator(func):
+            self._handlers[kind] = func
+            return func
+        return decorator
+
+    # Timers belong to the process that owns their guild; guild-less ones to shard 0's
+    def load(self, timers: List[Dict]) -> None:
+        owned = [timer for timer in timers if owns_guild(timer['payload'].get('guild_id', 0))]
+        for timer in owned:
+            self._push(timer)
+        if owned:
+            logger.info(f"⏰ Restored {len(owned)} pending timers.")
+
+    def snapshot(self) -> List[Dict]:
+        return [dict(timer) for timer in self._timers.values() if timer.get('persist', True)]
+
+    def _push(self, timer: Dict) -> None:
+        self._timers[timer['id']] = timer
+        heapq.heappush(self._heap, (timer['due_at'], timer['id']))
+        if self._wakeup and self._heap[0][1] == timer['id']:
+            self._wakeup.set()
+
+    # Re-using an id replaces the pending timer (e.g. muting an already muted member).
+    # With persist=False the timer only lives in memory and is dropped on restart.
+    async def schedule(self, timer_id: str, kind: str, delay: float, payload: Dict, persist: bool = True) -> None:
+        timer = {'id': timer_id, 'kind': kind, 'due_at': time.time() + delay, 'payload': payload}
+        if not persist:
+            timer['persist'] = False
+        self._push(timer)
+        if persist:
+            await storage.add_timer(timer)
+
+    # Heap entries are invalidated lazily when they surface
+    async def cancel(self, timer_id: str) -> bool:
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return False
+        if timer.get('persist', True):
+            await storage.remove_timer(timer_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = None
+            while self._heap:
+                due_at, timer_id = self._heap[0]
+                timer = self._timers.get(timer_id)
+                if timer is None or timer['due_at'] != due_at:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = due_at - time.time()
+                if delay > 0:
+                    break
+                heapq.heappop(self._heap)
+                del self._timers[timer_id]
+                self._dispatch(timer)
+                delay = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, timer: Dict) -> None:
+        task = asyncio.create_task(self._fire(timer))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    # The stored row is only removed once the handler succeeds (or the timer is
+    # given up on); a timer re-scheduled under its id meanwhile is left alone
+    async def _fire(self, timer: Dict) -> None:
+        handler = self._handlers.get(timer['kind'])
+        if handler is None:
+            logger.warning(f"⏰ No handler for timer kind {timer['kind']}")
+        else:
+            try:
+                await handler(**timer['payload'])
+            except Exception as e:
+                await self._retry(timer, e)
+                return
+        if timer.get('persist', True) and timer['id'] not in self._timers:
+            await storage.remove_timer(timer['id'])
+
+    async def _retry(self, timer: Dict, error: Exception) -> None:
+        if timer['id'] in self._timers:
+            return
+        attempts = timer.get('attempts', 0)
+        if attempts >= TIMER_MAX_RETRIES:
+            logger.error(f"⏰ Timer {timer['id']} failed {attempts + 1} times, giving up: {error}")
+            if timer.get('persist', True):
+                await storage.remove_timer(timer['id'])
+            return
+        delay = min(TIMER_RETRY_BASE * 2 ** attempts, TIMER_RETRY_MAX)
+        logger.warning(f"⏰ Timer {timer['id']} failed, retrying in {delay:.0f}s: {error}")
+        timer = dict(timer, due_at=time.time() + delay, attempts=attempts + 1)
+        self._push(timer)
+        if timer.get('persist', True):
+            await storage.add_timer(timer)
+
+scheduler = Scheduler()
+scheduler.load(data.get('timers', []))
+
+# Prometheus-style metrics, served as text on METRICS_HOST:METRICS_PORT (0 disables)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+class Metrics:
+    def __init__(self):
+        self._help: Dict[str, tuple] = {}
+        self._counters: Dict[tuple, float] = {}
+        self._gauges: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, Histogram] = {}
+        self._collectors: List[Callable] = []
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> tuple:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    # Collectors run at scrape time to copy in values that are cheap to read,
+    # gauges or counters another object keeps (described as 'counter')
+    def collector(self, func: Callable) -> Callable:
+        self._collectors.append(func)
+        return func
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = '') -> str:
+        parts = []
+        for key, value in labels:
+            value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{key}="{value}"')
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.error(f"Metrics collector {collect.__name__} failed: {e}")
+        lines = []
+        described = set()
+
+        def header(name: str, default_kind: str) -> None:
+            if name in described:
+                return
+            described.add(name)
+            kind, help_text = self._help.get(name, (default_kind, name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in sorted(self._counters.items()):
+            header(name, 'counter')
+            lines.append(f'{name}{self._labels(labels)} {value}')
+        for (name, labels), value in sorted(self._gauges.items()):
+            header(name, 'gauge')
+            lines.append(f'{name}{self._labels(labels)} {value}')
+        for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                bucket_labels = self._labels(labels, f'le="{bound}"')
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            inf_labels = self._labels(labels, 'le="+Inf"')
+            lines.append(f'{name}_bucket{inf_labels} {histogram.count}')
+            lines.append(f'{name}_sum{self._labels(labels)} {histogram.total}')
+            lines.append(f'{name}_count{self._labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+metrics.describe('bot_command_duration_seconds', 'histogram', 'Command handler latency.')
+metrics.describe('bot_command_errors_total', 'counter', 'Command errors by type.')
+metrics.describe('bot_command_cooldown_rejections_total', 'counter', 'Invocations rejected by a cooldown.')
+metrics.describe('bot_upstream_request_duration_seconds', 'histogram', 'Upstream HTTP request latency.')
+metrics.describe('bot_upstream_responses_total', 'counter', 'Upstream HTTP responses by status.')
+metrics.describe('bot_gateway_latency_seconds', 'gauge', 'Discord gateway heartbeat latency.')
+metrics.describe('bot_event_loop_lag_seconds', 'histogram', 'Event loop scheduling delay.')
+metrics.describe('bot_guilds', 'gauge', 'Guilds the bot is connected to.')
+metrics.describe('bot_log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full.')
+metrics.describe('bot_meme_search_total', 'counter', '!searchmm lookups by where they were answered.')
+metrics.describe('bot_meme_duplicates_total', 'counter', 'Meme submissions rejected as duplicates, by how they matched.')
+metrics.describe('bot_storage_flush_duration_seconds', 'histogram', 'JSON storage flush latency.')
+metrics.describe('bot_storage_flushed_mutations_total', 'counter', 'Mutations written by JSON storage flushes.')
+metrics.describe('bot_shard_latency_seconds', 'gauge', 'Gateway heartbeat latency per shard.')
+metrics.describe('bot_upstream_requests_issued_total', 'counter', 'Upstream requests sent since start.')
+metrics.describe('bot_upstream_requests_coalesced_total', 'counter', 'Upstream requests served by an identical in-flight request.')
+metrics.describe('bot_upstream_requests_retried_total', 'counter', 'Upstream requests retried after a 429 or 5xx.')
+metrics.describe('bot_upstream_requests_throttled_total', 'counter', 'Upstream requests dropped by the client-side rate limiter.')
+
+# Fully read upstream response, safe to share between coalesced callers.
+# Header names are lower-cased.
+class UpstreamResponse(NamedTuple):
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    text: str
+
+    def json(self):
+        return json.loads(self.text)
+
+RATE_LIMITED_RESPONSE = UpstreamResponse(429, 'Client-side rate limit exceeded', {}, '{}')
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    # Takes a token now and returns how long the caller must wait for it.
+    # Tokens may go negative, which queues callers in arrival order.
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 0:
+            wait = max(wait, -self.tokens / self.rate)
+        return wait
+
+    def release(self) -> None:
+        self.tokens += 1
+
+    def block_for(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+# Remaining/reset header pairs, lower-cased: the common X-RateLimit-* names and
+# Imgur's per-user and POST quotas (X-RateLimit-UserRemaining, X-Post-Rate-Limit-*)
+RATE_LIMIT_HEADERS = (
+    ('x-ratelimit-remaining', 'x-ratelimit-reset'),
+    ('x-ratelimit-userremaining', 'x-ratelimit-userreset'),
+    ('x-post-rate-limit-remaining', 'x-post-rate-limit-reset'),
+)
+
+def _quota_exhausted(remaining: Optional[str]) -> bool:
+    try:
+        return remaining is not None and int(float(remaining)) <= 0
+    except ValueError:
+        return False
+
+# Reset is either an epoch timestamp (Imgur) or a number of seconds
+def _quota_reset_delay(reset: Optional[str]) -> Optional[float]:
+    try:
+        reset = float(reset)
+    except (TypeError, ValueError):
+        return None
+    return max(reset - time.time(), 0.0) if reset > 1e9 else max(reset, 0.0)
+
+# Seconds the upstream asked us to back off, from Retry-After or an exhausted
+# quota; headers are expected lower-cased, as _request stores them
+def rate_limit_delay(response_headers: Dict[str, str]) -> Optional[float]:
+    retry_after = response_headers.get('retry-after')
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    for remaining, reset in RATE_LIMIT_HEADERS:
+        if _quota_exhausted(response_headers.get(remaining)):
+            delay = _quota_reset_delay(response_headers.get(reset))
+            if delay is not None:
+                return delay
+    # Imgur sends no reset for the daily client quota: wait for the user reset
+    # if there is one, else until the quota refills at the next UTC day
+    if _quota_exhausted(response_headers.get('x-ratelimit-clientremaining')):
+        delay = _quota_reset_delay(response_headers.get('x-ratelimit-userreset'))
+        if delay is not None:
+            return delay
+        return 86400 - time.time() % 86400
+    return None
+
+# Shared HTTP client used by every upstream helper
+class HTTPClient:
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._buckets = {host: TokenBucket(rate, burst) for host, (rate, burst) in RATE_LIMITS.items()}
+        self.issued = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.throttled = 0
+
+    async def start(self) -> None:
+        if self._session and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_LIMIT,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.info("🌐 HTTP client started.")
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("🌐 HTTP client closed.")
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP client is not started.")
+        return self._session
+
+    def get(self, url: str, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    async def _request(self, url: str, headers: Optional[Dict], params: Optional[Dict]) -> UpstreamResponse:
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            async with self.get(url, headers=headers, params=params) as response:
+                status = response.status
+                text = await response.text()
+                response_headers = {name.lower(): value for name, value in response.headers.items()}
+                return UpstreamResponse(response.status, response.reason or '', response_headers, text)
+        finally:
+            metrics.observe('bot_upstream_request_duration_seconds', time.perf_counter() - started, host=host)
+            metrics.inc('bot_upstream_responses_total', host=host, status=status)
+
+    # Waits for the host's token bucket, retries 429/5xx with jittered backoff,
+    # and gives up with a 429 once the total wait would exceed HTTP_MAX_QUEUE_WAIT
+    async def _fetch(self, url: str, headers: Optional[Dict], params: Optional[Dict]) -> UpstreamResponse:
+        bucket = self._buckets.get(urlsplit(url).netloc)
+        deadline = time.monotonic() + HTTP_MAX_QUEUE_WAIT
+        attempt = 0
+        while True:
+            if bucket:
+                wait = bucket.reserve()
+                if time.monotonic() + wait > deadline:
+                    bucket.release()
+                    self.throttled += 1
+                    upstream_logger.warning(f"🚦 Client-side rate limit for {urlsplit(url).netloc}, dropping request")
+                    return RATE_LIMITED_RESPONSE
+                if wait:
+                    await asyncio.sleep(wait)
+
+            response = await self._request(url, headers, params)
+            delay = rate_limit_delay(response.headers)
+            if bucket and delay:
+                bucket.block_for(delay)
+            if (response.status != 429 and response.status < 500) or attempt >= HTTP_MAX_RETRIES:
+                return response
+
+            backoff = delay if delay is not None else random.uniform(0, HTTP_RETRY_BASE * 2 ** attempt)
+            if time.monotonic() + backoff > deadline:
+                return response
+            attempt += 1
+            self.retried += 1
+            upstream_logger.warning(f"Upstream {response.status} from {url}, retry {attempt} in {backoff:.2f}s")
+            await asyncio.sleep(backoff)
+
+    # Concurrent callers for the same URL share one in-flight request unless
+    # coalesce=False, which endpoints returning random content must pass
+    async def fetch(self, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+                    coalesce: bool = True) -> UpstreamResponse:
+        if not coalesce:
+            self.issued += 1
+            return await self._fetch(url, headers, params)
+
+        key = (url, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            self.issued += 1
+            task = asyncio.create_task(self._fetch(url, headers, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._request_done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _request_done(self, key: tuple, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller gave up
+
+http_client = HTTPClient()
+
+# Command cooldowns: fixed windows of `rate` uses per `per` seconds, keyed by
+# name (command or upstream), bucket and ID. Windows known to be exhausted are
+# answered from memory; the SQLite backend shares windows between processes and
+# keeps them across restarts.
+COOLDOWN_BACKEND = os.getenv('COOLDOWN_BACKEND', 'sqlite' if STORAGE_BACKEND == 'sqlite' else 'memory')
+UPSTREAM_GUILD_COOLDOWN = (int(os.getenv('UPSTREAM_GUILD_RATE', '20')), float(os.getenv('UPSTREAM_GUILD_PER', '60')))
+UPSTREAM_GLOBAL_COOLDOWN = (int(os.getenv('UPSTREAM_GLOBAL_RATE', '120')), float(os.getenv('UPSTREAM_GLOBAL_PER', '60')))
+COOLDOWN_PRUNE_EVERY = 1000
+
+COOLDOWN_BUCKET_TYPES = {
+    'user': commands.BucketType.user,
+    'guild': commands.BucketType.guild,
+    'global': commands.BucketType.default,
+}
+
+# Returns (retry_after, window_end, used) after trying to take cost uses; a
+# cost above the rate takes the whole window
+def take_cooldown(window: Optional[tuple], rate: int, per: float, now: float, cost: int = 1) -> tuple:
+    window_end, used = window if window and window[0] > now else (now + per, 0)
+    cost = min(cost, rate)
+    if used + cost > rate:
+        return window_end - now, window_end, used
+    return 0.0, window_end, used + cost
+
+class CooldownBackend:
+    def __init__(self):
+        self._windows: Dict[str, tuple] = {}
+        self._hits = 0
+
+    # Limits are (key, rate, per, shared) tuples, shared meaning other shard
+    # processes charge the window too. Either every window takes cost uses or,
+    # when one is exhausted, none does; returns (index of that limit,
+    # retry_after) or None if the invocation is allowed.
+    async def hit(self, limits: List[tuple], cost: int = 1) -> Optional[tuple]:
+        now = time.time()
+        for index, (key, rate, per, _) in enumerate(limits):
+            window = self._windows.get(key)
+            if window and window[0] > now and window[1] + min(cost, rate) > rate:
+                return index, window[0] - now
+        return await self._take(limits, now, cost)
+
+    async def _take(self, limits: List[tuple], now: float, cost: int = 1) -> Optional[tuple]:
+        return self._store(limits, [take_cooldown(self._windows.get(key), rate, per, now, cost)
+                                    for key, rate, per, _ in limits])
+
+    # Keeps take_cooldown's results for the limits, or only the first exhausted one
+    def _store(self, limits: List[tuple], results: List[tuple]) -> Optional[tuple]:
+        for index, (retry_after, window_end, used) in enumerate(results):
+            if retry_after:
+                self._windows[limits[index][0]] = (window_end, used)
+                return index, retry_after
+        for (key, *_), (_, window_end, used) in zip(limits, results):
+            self._windows[key] = (window_end, used)
+        self._hits += 1
+        if self._hits % COOLDOWN_PRUNE_EVERY == 0:
+            now = time.time()
+            self._windows = {key: window for key, window in self._windows.items() if window[0] > now}
+        return None
+
+    async def close(self) -> None:
+        pass
+
+class SQLiteCooldownBackend(CooldownBackend):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cooldowns (
+            key TEXT PRIMARY KEY,
+            window_end REAL NOT NULL,
+            used INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_cooldowns_end ON cooldowns (window_end);
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cooldowns')
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        self._writes = 0
+
+    def _take_sync(self, limits: List[tuple], now: float, cost: int) -> List[tuple]:
+        with _SQLiteTransaction(self._conn):
+            results = []
+            for key, rate, per in limits:
+                window = self._conn.execute('SELECT window_end, used FROM cooldowns WHERE key = ?', (key,)).fetchone()
+                results.append(take_cooldown(window, rate, per, now, cost))
+            if any(result[0] for result in results):
+                return results
+            self._conn.executemany('INSERT OR REPLACE INTO cooldowns (key, window_end, used) VALUES (?, ?, ?)',
+                                   [(key, window_end, used) for (key, _, _), (_, window_end, used) in zip(limits, results)])
+        self._writes += 1
+        if self._writes % COOLDOWN_PRUNE_EVERY == 0:
+            self._conn.execute('DELETE FROM cooldowns WHERE window_end <= ?', (now,))
+        return results
+
+    # Per-user windows stay in this process's memory; only guild and global
+    # windows, which every shard process charges, go through the database. The
+    # in-memory windows are taken first and given back if the database rejects.
+    async def _take(self, limits: List[tuple], now: float, cost: int = 1) -> Optional[tuple]:
+        shared = [index for index, limit in enumerate(limits) if limit[3]]
+        if not shared:
+            return await super()._take(limits, now, cost)
+        local = [index for index, limit in enumerate(limits) if not limit[3]]
+        rejected = await super()._take([limits[index] for index in local], now, cost)
+        if rejected:
+            return local[rejected[0]], rejected[1]
+        taken = {limits[index][0]: (self._windows[limits[index][0]][0], min(cost, limits[index][1])) for index in local}
+        stored = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._take_sync, [limits[index][:3] for index in shared], now, cost)
+        rejected = self._store([limits[index] for index in shared], stored)
+        if rejected:
+            for key, (window_end, uses) in taken.items():
+                window = self._windows.get(key)
+                if window and window[0] == window_end:
+                    self._windows[key] = (window_end, max(window[1] - uses, 0))
+            return shared[rejected[0]], rejected[1]
+        return None
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown(wait=True)
+
+def create_cooldown_backend() -> CooldownBackend:
+    if COOLDOWN_BACKEND == 'memory':
+        return CooldownBackend()
+    if COOLDOWN_BACKEND == 'sqlite':
+        return SQLiteCooldownBackend(DB_FILE)
+    raise ValueError(f"Unknown COOLDOWN_BACKEND: {COOLDOWN_BACKEND}")
+
+cooldowns = create_cooldown_backend()
+
+# Use below @bot.command in place of commands.cooldown. Limits are checked top
+# to bottom after the arguments parsed; the first exhausted one rejects, and
+# then none of them is charged.
+def shared_cooldown(rate: int, per: float, bucket: str = 'user', name: Optional[str] = None):
+    def decorator(func):
+        func.__dict__.setdefault('__shared_cooldowns__', []).insert(0, (rate, per, bucket, name))
+        return func
+    return decorator
+
+# Per-guild and global budgets for commands that spend an upstream's quota
+def upstream_cooldown(upstream: str):
+    def decorator(func):
+        func = shared_cooldown(*UPSTREAM_GLOBAL_COOLDOWN, bucket='global', name=upstream)(func)
+        return shared_cooldown(*UPSTREAM_GUILD_COOLDOWN, bucket='guild', name=upstream)(func)
+    return decorator
+
+def cooldown_key(ctx: commands.Context, bucket: str, name: Optional[str]) -> str:
+    if bucket == 'user':
+        bucket_id = ctx.author.id
+    elif bucket == 'guild':
+        bucket_id = (ctx.guild or ctx.author).id
+    else:
+        bucket_id = 0
+    return f'{name or ctx.command.qualified_name}:{bucket}:{bucket_id}'
+
+# Limits are (rate, per, bucket, name) tuples, all charged together or not at all
+async def apply_cooldowns(ctx: commands.Context, limits: List[tuple], cost: int = 1) -> None:
+    rejected = await cooldowns.hit([(cooldown_key(ctx, bucket, name), rate, per, bucket != 'user')
+                                    for rate, per, bucket, name in limits], cost)
+    if rejected:
+        index, retry_after = rejected
+        rate, per, bucket, _ = limits[index]
+        raise commands.CommandOnCooldown(commands.Cooldown(rate, per), retry_after, COOLDOWN_BUCKET_TYPES[bucket])
+
+async def enforce_shared_cooldowns(ctx: commands.Context) -> None:
+    limits = getattr(ctx.command.callback, '__shared_cooldowns__', None)
+    if limits:
+        await apply_cooldowns(ctx, limits)
+
+# The upstream_cooldown budgets, for commands that only sometimes reach the
+# upstream; cost is the number of upstream requests the command stands for
+async def spend_upstream_budget(ctx: commands.Context, upstream: str, cost: int = 1) -> None:
+    await apply_cooldowns(ctx, [(*UPSTREAM_GUILD_COOLDOWN, 'guild', upstream),
+                                (*UPSTREAM_GLOBAL_COOLDOWN, 'global', upstream)], cost)
+
+# AutoShardedBot runs its shards on one event loop; a worker process only runs SHARD_IDS
+class GreenMemesBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
+    async def setup_hook(self) -> None:
+        await http_client.start()
+        prewarm_meme_cache.start()
+        scheduler.start()
+        fact_buffer.ensure_refill()
+        measure_loop_lag.start()
+        if SHARED_STATE:
+            sync_shared_state_loop.start()
+        await start_metrics_server()
+
+    async def close(self) -> None:
+        prewarm_meme_cache.cancel()
+        measure_loop_lag.cancel()
+        sync_shared_state_loop.cancel()
+        scheduler.stop()
+        await stop_metrics_server()
+        await super().close()
+        await http_client.close()
+        await cooldowns.close()
+        hash_executor.shutdown(wait=False)
+        await storage.close()
+
+shard_options = {'shard_count': shard_count, 'shard_ids': shard_ids} if SHARD_COUNT else {}
+bot = GreenMemesBot(command_prefix='!', intents=intents, **shard_options)
+
+@bot.before_invoke
+async def before_command(ctx: commands.Context):
+    ctx.metrics_started = time.perf_counter()
+    await enforce_shared_cooldowns(ctx)
+
+@bot.after_invoke
+async def record_command_latency(ctx: commands.Context):
+    started = getattr(ctx, 'metrics_started', None)
+    if started is not None and ctx.command:
+        metrics.observe('bot_command_duration_seconds', time.perf_counter() - started,
+                        command=ctx.command.qualified_name, status='error' if ctx.command_failed else 'ok')
+
+LOOP_LAG_PROBE = 0.25
+
+@tasks.loop(seconds=1)
+async def measure_loop_lag():
+    started = time.perf_counter()
+    await asyncio.sleep(LOOP_LAG_PROBE)
+    metrics.observe('bot_event_loop_lag_seconds', max(time.perf_counter() - started - LOOP_LAG_PROBE, 0.0))
+
+@metrics.collector
+def collect_runtime_metrics():
+    if bot.latency == bot.latency and bot.latency != float('inf'):  # NaN/inf before the first heartbeat
+        metrics.set('bot_gateway_latency_seconds', bot.latency)
+    metrics.set('bot_guilds', len(bot.guilds))
+    metrics.set('bot_log_records_dropped_total', log_handler.dropped)
+    if isinstance(bot, commands.AutoShardedBot):
+        for shard_id, latency in bot.latencies:
+            if latency == latency and latency != float('inf'):
+                metrics.set('bot_shard_latency_seconds', latency, shard=shard_id)
+    metrics.set('bot_upstream_requests_issued_total', http_client.issued)
+    metrics.set('bot_upstream_requests_coalesced_total', http_client.coalesced)
+    metrics.set('bot_upstream_requests_retried_total', http_client.retried)
+    metrics.set('bot_upstream_requests_throttled_total', http_client.throttled)
+
+metrics_runner: Optional[web.AppRunner] = None
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
+
+async def start_metrics_server() -> None:
+    global metrics_runner
+    if not METRICS_PORT or metrics_runner:
+        return
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    metrics_runner = web.AppRunner(app, access_log=None)
+    await metrics_runner.setup()
+    await web.TCPSite(metrics_runner, METRICS_HOST, METRICS_PORT).start()
+    logger.info(f"📈 Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+async def stop_metrics_server() -> None:
+    global metrics_runner
+    if metrics_runner:
+        await metrics_runner.cleanup()
+        metrics_runner = None
 
 facts = [
     "**Melting glaciers are causing sea levels to rise.**",
@@ -117,86 +1895,815 @@ categories = {
     'psychology': []
 }
 
+# Incrementally maintained meme pools for O(1) random picks in !meme
+MEME_WEIGHTED_PICKS = os.getenv('MEME_WEIGHTED_PICKS', '0') == '1'
+
+class MemePool:
+    def __init__(self):
+        self._urls: List[str] = []
+        self._ids: List[int] = []
+        self._positions: Dict[int, int] = {}
+
+    def add(self, meme_id: int, url: str) -> None:
+        self._positions[meme_id] = len(self._urls)
+        self._urls.append(url)
+        self._ids.append(meme_id)
+
+    # Swap the last item into the hole so removal stays O(1)
+    def remove(self, meme_id: int) -> bool:
+        position = self._positions.pop(meme_id, None)
+        if position is None:
+            return False
+        last_url = self._urls.pop()
+        last_id = self._ids.pop()
+        if position < len(self._urls):
+            self._urls[position] = last_url
+            self._ids[position] = last_id
+            self._positions[last_id] = position
+        return True
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __getitem__(self, position: int) -> str:
+        return self._urls[position]
+
+    def choice(self) -> Optional[str]:
+        return random.choice(self._urls) if self._urls else None
+
+class FenwickTree:
+    def __init__(self, capacity: int = 16):
+        self._size = 1
+        while self._size < capacity:
+            self._size *= 2
+        self._tree = [0] * (self._size + 1)
+        self._values = [0] * self._size
+        self.total = 0
+
+    def _grow(self, needed: int) -> None:
+        size = self._size
+        while size < needed:
+            size *= 2
+        values = self._values + [0] * (size - self._size)
+        self._size = size
+        self._values = values
+        # O(n) bottom-up rebuild
+        self._tree = [0] + values
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self._tree[parent] += self._tree[i]
+
+    def set(self, index: int, value: int) -> None:
+        if index >= self._size:
+            self._grow(index + 1)
+        delta = value - self._values[index]
+        if not delta:
+            return
+        self._values[index] = value
+        self.total += delta
+        i = index + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    # Smallest index whose prefix sum exceeds target (0 <= target < total)
+    def find(self, target: int) -> int:
+        position = 0
+        step = self._size
+        while step:
+            nxt = position + step
+            if nxt <= self._size and self._tree[nxt] <= target:
+                position = nxt
+                target -= self._tree[nxt]
+            step //= 2
+        return position
+
+# User memes are picked straight from the MemeStore; only the category pools
+# and the per-user weights for weighted picks live here
+class MemeIndex:
+    def __init__(self, store: MemeStore):
+        self.store = store
+        self.clear()
+
+    def clear(self) -> None:
+        self._next_id = 0
+        self._locations: Dict[int, str] = {}
+        self.category_pools: Dict[str, MemePool] = {}
+        self.all_category = MemePool()
+        self._user_slots: Dict[int, int] = {}
+        self._slot_users: List[int] = []
+        self._user_votes: Dict[int, int] = {}
+        self._weights = FenwickTree()
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def rebuild(self, categories: Dict[str, List[str]], votes: Dict) -> None:
+        self.clear()
+        for category, memes in categories.items():
+            self.category_pools[category] = MemePool()
+            for url in memes:
+                self.add_category_meme(category, url)
+        for user_id in self.store.owners():
+            self._update_weight(user_id)
+        for user_id, total in votes.items():
+            self.set_votes(user_id, total)
+
+    def add_category_meme(self, category: str, url: str) -> int:
+        meme_id = self._new_id()
+        self.category_pools.setdefault(category, MemePool()).add(meme_id, url)
+        self.all_category.add(meme_id, url)
+        self._locations[meme_id] = category
+        return meme_id
+
+    # Call after the meme was added to the store
+    def add_user_meme(self, user_id: int) -> None:
+        self._update_weight(user_id)
+
+    def remove(self, meme_id: int) -> bool:
+        category = self._locations.pop(meme_id, None)
+        if category is None:
+            return False
+        self.category_pools[category].remove(meme_id)
+        self.all_category.remove(meme_id)
+        return True
+
+    def set_votes(self, user_id: int, total: int) -> None:
+        self._user_votes[user_id] = total
+        self._update_weight(user_id)
+
+    def reset_votes(self) -> None:
+        for user_id in list(self._user_votes):
+            self.set_votes(user_id, 0)
+        self._user_votes.clear()
+
+    # A user's memes weigh (1 + positive votes) each in weighted picks
+    def _update_weight(self, user_id: int) -> None:
+        count = self.store.count_of(user_id)
+        slot = self._user_slots.get(user_id)
+        if slot is None:
+            if not count:
+                return
+            slot = self._user_slots[user_id] = len(self._slot_users)
+            self._slot_users.append(user_id)
+        self._weights.set(slot, count * (1 + max(self._user_votes.get(user_id, 0), 0)))
+
+    def pick_user_meme(self, user_id: int) -> Optional[str]:
+        return self.store.random_url_of(user_id)
+
+    def pick(self, category: Optional[str] = None, weighted: bool = MEME_WEIGHTED_PICKS) -> Optional[str]:
+        primary = self.category_pools.get(category, self.all_category) if category else self.all_category
+        user_total = self._weights.total if weighted else len(self.store)
+        total = len(primary) + user_total
+        if not total:
+            return None
+        target = random.randrange(total)
+        if target < len(primary):
+            return primary[target]
+        target -= len(primary)
+        if not weighted:
+            return self.store.url_at(target)
+        user_id = self._slot_users[self._weights.find(target)]
+        return self.store.random_url_of(user_id)
+
+meme_index = MemeIndex(meme_store)
+meme_index.rebuild(categories, votes)
+
+# Local meme search: token -> URLs posting lists over our own collection and the
+# galleries fetched from Imgur, so !searchmm only calls Imgur on a miss
+MEME_SEARCH_MAX_FETCHED = int(os.getenv('MEME_SEARCH_MAX_FETCHED', '50000'))
+MEME_SEARCH_MIN_RESULTS = int(os.getenv('MEME_SEARCH_MIN_RESULTS', '1'))
+
+SEARCH_TOKEN = re.compile(r'[^\W_]{2,}')
+SEARCH_STOPWORDS = frozenset([
+    'http', 'https', 'www', 'com', 'net', 'org', 'imgur', 'jpg', 'jpeg', 'png', 'gif', 'gifv', 'webp', 'mp4',
+    'the', 'and', 'of', 'to', 'in', 'on', 'is', 'it', 'for', 'my', 'me', 'this', 'that', 'with', 'when',
+])
+
+# Plurals fold onto the singular so 'cats' finds 'cat' and vice versa
+def search_tokens(*texts: str) -> set:
+    tokens = set()
+    for text in texts:
+        if text:
+            tokens.update(SEARCH_TOKEN.findall(text.casefold()))
+    tokens -= SEARCH_STOPWORDS
+    return {token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+            for token in tokens}
+
+class InvertedIndex:
+    def __init__(self, max_docs: Optional[int] = None):
+        self.max_docs = max_docs
+        self._docs: 'OrderedDict[str, set]' = OrderedDict()
+        self._postings: Dict[str, set] = {}
+
+    def add(self, url: str, tokens: set) -> None:
+        known = self._docs.get(url)
+        if known is None:
+            known = self._docs[url] = set()
+        else:
+            self._docs.move_to_end(url)
+        for token in tokens - known:
+            self._postings.setdefault(token, set()).add(url)
+        known |= tokens
+        if self.max_docs is not None:
+            while len(self._docs) > self.max_docs:
+                self.remove(next(iter(self._docs)))
+
+    def remove(self, url: str) -> bool:
+        tokens = self._docs.pop(url, None)
+        if tokens is None:
+            return False
+        for token in tokens:
+            urls = self._postings[token]
+            urls.discard(url)
+            if not urls:
+                del self._postings[token]
+        return True
+
+    # AND over the query tokens, intersecting from the shortest posting list
+    def search(self, tokens: set) -> set:
+        postings = sorted((self._postings.get(token, ()) for token in tokens), key=len)
+        if not postings or not postings[0]:
+            return set()
+        return set(postings[0]).intersection(*postings[1:])
+
+    def clear(self) -> None:
+        self._docs.clear()
+        self._postings.clear()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+class MemeSearch:
+    def __init__(self, max_fetched: int = MEME_SEARCH_MAX_FETCHED):
+        self.owned = InvertedIndex()
+        self.fetched = InvertedIndex(max_fetched)
+
+    def rebuild(self, categories: Dict[str, List[str]], urls: Iterator[str]) -> None:
+        self.owned.clear()
+        for category, memes in categories.items():
+            for url in memes:
+                self.add_owned(url, category)
+        for url in urls:
+            self.add_owned(url)
+
+    def add_owned(self, url: str, *texts: str) -> None:
+        self.owned.add(url, search_tokens(url, *texts))
+
+    def add_fetched(self, url: str, *texts: str) -> None:
+        self.fetched.add(url, search_tokens(url, *texts))
+
+    def search(self, query: str) -> List[str]:
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        return list(self.owned.search(tokens) | self.fetched.search(tokens))
+
+meme_search = MemeSearch()
+meme_search.rebuild(categories, meme_store.urls())
+
+# Vote leaderboard kept sorted on every vote. Entries are (-score, user_id) in
+# sorted blocks of BLOCK_SIZE to 2 * BLOCK_SIZE entries, found by bisecting the
+# blocks' last entries, so a vote moves at most one block's worth of entries
+# instead of shifting the whole list: O(log n + BLOCK_SIZE) per update, O(K)
+# top-K, and rank adds up the block sizes in front of the user's block.
+class VoteRanking:
+    BLOCK_SIZE = 512
+
+    def __init__(self):
+        self._scores: Dict[int, int] = {}
+        self._blocks: List[List[tuple]] = []
+        self._maxes: List[tuple] = []
+
+    def rebuild(self, votes: Dict) -> None:
+        self._scores = {int(user_id): total for user_id, total in votes.items()}
+        order = sorted((-total, user_id) for user_id, total in self._scores.items())
+        self._blocks = [order[i:i + self.BLOCK_SIZE] for i in range(0, len(order), self.BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+
+    def _insert(self, entry: tuple) -> None:
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return
+        i = min(bisect.bisect_left(self._maxes, entry), len(self._blocks) - 1)
+        block = self._blocks[i]
+        bisect.insort(block, entry)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self._maxes[i:i + 1] = [self._blocks[i][-1], self._blocks[i + 1][-1]]
+
+    def _remove(self, entry: tuple) -> None:
+        i = bisect.bisect_left(self._maxes, entry)
+        block = self._blocks[i]
+        del block[bisect.bisect_left(block, entry)]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+
+    def update(self, user_id, total: int) -> None:
+        user_id = int(user_id)
+        previous = self._scores.get(user_id)
+        if previous is not None:
+            self._remove((-previous, user_id))
+        self._scores[user_id] = total
+        self._insert((-total, user_id))
+
+    def clear(self) -> None:
+        self._scores.clear()
+        self._blocks.clear()
+        self._maxes.clear()
+
+    def top(self, k: int) -> List[tuple]:
+        result = []
+        for block in self._blocks:
+            for score, user_id in block[:k - len(result)]:
+                result.append((user_id, -score))
+            if len(result) >= k:
+                break
+        return result
+
+    def score(self, user_id) -> int:
+        return self._scores.get(int(user_id), 0)
+
+    def scores(self) -> Dict[int, int]:
+        return dict(self._scores)
+
+    def rank(self, user_id) -> Optional[int]:
+        user_id = int(user_id)
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        entry = (-score, user_id)
+        i = bisect.bisect_left(self._maxes, entry)
+        return sum(map(len, self._blocks[:i])) + bisect.bisect_left(self._blocks[i], entry) + 1
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+vote_ranking = VoteRanking()
+vote_ranking.rebuild(votes)
+
+# Vote ledger: at most one ±1 vote per (meme, voter). Each meme keeps its voters
+# in a sorted array('Q') with a parallel array('b') of values (9 bytes a vote),
+# and per-meme scores sit in a VoteRanking, so votes and !topmeme never rescan.
+class VoteLedger:
+    def __init__(self, store: MemeStore):
+        self.store = store
+        self._voters: Dict[int, array] = {}
+        self._values: Dict[int, array] = {}
+        self._ranking = VoteRanking()
+
+    # Call after the store is loaded; votes on memes it doesn't have are dropped
+    def load(self, meme_votes: List) -> None:
+        self.reset_votes()
+        for meme_id, voter_id, value in meme_votes:
+            if self.store.owner(meme_id) is not None:
+                self._set(meme_id, voter_id, value)
+        self._ranking.rebuild({meme_id: sum(values) for meme_id, values in self._values.items()})
+
+    # Stores the vote (0 withdraws it) and returns the change to the meme's score
+    def _set(self, meme_id: int, voter_id: int, value: int) -> int:
+        voters = self._voters.get(meme_id)
+        if voters is None:
+            voters = self._voters[meme_id] = array('Q')
+            self._values[meme_id] = array('b')
+        values = self._values[meme_id]
+        i = bisect.bisect_left(voters, voter_id)
+        if i < len(voters) and voters[i] == voter_id:
+            previous = values[i]
+            if value:
+                values[i] = value
+            else:
+                del voters[i]
+                del values[i]
+        else:
+            previous = 0
+            if value:
+                voters.insert(i, voter_id)
+                values.insert(i, value)
+        return value - previous
+
+    def vote(self, meme_id: int, voter_id: int, value: int) -> int:
+        delta = self._set(meme_id, int(voter_id), value)
+        if delta:
+            self._ranking.update(meme_id, self._ranking.score(meme_id) + delta)
+        return delta
+
+    def score(self, meme_id: int) -> int:
+        return self._ranking.score(meme_id)
+
+    # The voter's current vote on the meme, 0 if none
+    def vote_of(self, meme_id: int, voter_id: int) -> int:
+        voters = self._voters.get(meme_id)
+        if voters is None:
+            return 0
+        voter_id = int(voter_id)
+        i = bisect.bisect_left(voters, voter_id)
+        return self._values[meme_id][i] if i < len(voters) and voters[i] == voter_id else 0
+
+    def top(self, k: int) -> List[tuple]:
+        return self._ranking.top(k)
+
+    def reset_votes(self) -> None:
+        self._voters.clear()
+        self._values.clear()
+        self._ranking.clear()
+
+    def vote_rows(self) -> List[list]:
+        return [[meme_id, voter_id, value] for meme_id, voters in self._voters.items()
+                for voter_id, value in zip(voters, self._values[meme_id])]
+
+    def __len__(self) -> int:
+        return sum(len(voters) for voters in self._voters.values())
+
+meme_ledger = VoteLedger(meme_store)
+meme_ledger.load(data['meme_votes'])
+
+# Moves one voter's vote and the owner's total everywhere it is indexed;
+# returns the change to the total
+def apply_vote(meme_id: int, voter_id: int, value: int) -> int:
+    owner = meme_store.owner(meme_id)
+    if owner is None:
+        return 0
+    delta = meme_ledger.vote(meme_id, voter_id, value)
+    if delta:
+        votes[owner] = votes.get(owner, 0) + delta
+        meme_index.set_votes(owner, votes[owner])
+        vote_ranking.update(owner, votes[owner])
+    return delta
+
+# Meme submissions: memes keep the URL they were posted with, and a canonical
+# form of it is the key the store's URL index finds duplicates by, so one image
+# posted under different links is caught. With MEME_CONTENT_HASH=1, media on
+# MEME_HASH_HOSTS is also fetched (at most MEME_HASH_PREFIX_BYTES of it) and
+# hashed on a small thread pool to catch re-uploads under a new URL.
+MEME_CONTENT_HASH = os.getenv('MEME_CONTENT_HASH', '0') == '1'
+MEME_HASH_PREFIX_BYTES = int(os.getenv('MEME_HASH_PREFIX_BYTES', '262144'))
+MEME_HASH_TIMEOUT = float(os.getenv('MEME_HASH_TIMEOUT', '5'))
+MEME_HASH_WORKERS = int(os.getenv('MEME_HASH_WORKERS', '2'))
+MEME_HASH_HOSTS = frozenset(host.strip().lower() for host in
+                            os.getenv('MEME_HASH_HOSTS', 'i.imgur.com,cdn.discordapp.com,i.redd.it').split(',')
+                            if host.strip())
+
+def url_duplicate(url: str) -> Optional[int]:
+    for variant in url_variants(url):
+        meme_id = meme_store.find_url(variant)
+        if meme_id is not None:
+            return meme_id
+    return None
+
+hash_executor = ThreadPoolExecutor(max_workers=MEME_HASH_WORKERS, thread_name_prefix='meme-hash')
+
+# The declared size goes into the digest too, so two files that only share a prefix don't match
+def hash_media_prefix(prefix: bytes, size: str) -> bytes:
+    digest = hashlib.blake2b(prefix, digest_size=16)
+    digest.update(size.encode())
+    return digest.digest()
+
+async def fetch_media_prefix(url: str) -> Optional[tuple]:
+    limit = MEME_HASH_PREFIX_BYTES
+    timeout = aiohttp.ClientTimeout(total=MEME_HASH_TIMEOUT)
+    # Redirects aren't followed: they could lead off MEME_HASH_HOSTS
+    async with http_client.get(url, headers={'Range': f'bytes=0-{limit - 1}'}, timeout=timeout,
+                               allow_redirects=False) as response:
+        if response.status not in (200, 206):
+            return None
+        # "bytes 0-262143/1048576" on a ranged reply, else the full length
+        size = response.headers.get('Content-Range', '').rpartition('/')[2] or response.headers.get('Content-Length', '')
+        prefix = bytearray()
+        while len(prefix) < limit:
+            chunk = await response.content.read(limit - len(prefix))
+            if not chunk:
+                break
+            prefix += chunk
+        return bytes(prefix), size
+
+async def content_hash(url: str) -> Optional[bytes]:
+    if not MEME_CONTENT_HASH or urlsplit(url).hostname not in MEME_HASH_HOSTS:
+        return None
+    try:
+        fetched = await fetch_media_prefix(url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        upstream_logger.warning(f"🔍 Couldn't fetch {url} to hash it: {e}")
+        return None
+    if not fetched:
+        return None
+    return await asyncio.get_running_loop().run_in_executor(hash_executor, hash_media_prefix, *fetched)
+
+# Adds a new meme to the store and every in-memory view and returns its ID
+async def register_meme(user_id: int, meme_url: str, digest: Optional[bytes] = None,
+                        url_key: Optional[str] = None) -> int:
+    created_at = time.time()
+    if url_key == meme_url:
+        url_key = None
+    meme_id = await storage.add_meme(str(user_id), meme_url, created_at, digest.hex() if digest else None, url_key)
+    index_meme(meme_id, user_id, meme_url, created_at, digest, url_key)
+    return meme_id
+
+def index_meme(meme_id: int, user_id: int, meme_url: str, created_at: float, digest: Optional[bytes] = None,
+               url_key: Optional[str] = None) -> None:
+    if meme_store.add(meme_id, user_id, meme_url, created_at, digest, url_key):
+        meme_index.add_user_meme(user_id)
+        meme_search.add_owned(meme_url)
+
+# URLs between their duplicate check and being stored, so concurrent reposts are caught too
+_pending_memes = set()
+
+# Runs the submission pipeline and replies on rejection; returns (meme ID, URL) when stored
+async def accept_meme(ctx: commands.Context, meme_url: str) -> Optional[tuple]:
+    url = meme_url.strip().strip('<>')
+    key = canonicalize_url(url)
+    if key is None:
+        await ctx.send("❗ Please submit a valid URL.")
+        return None
+    duplicate = url_duplicate(key)
+    match = 'url'
+    if duplicate is None:
+        if key in _pending_memes:
+            await ctx.send("❗ **That meme is being submitted right now.**")
+            return None
+        _pending_memes.add(key)
+        try:
+            digest = await content_hash(url)
+            duplicate = meme_store.find_content(digest) if digest else None
+            if duplicate is None:
+                return await register_meme(ctx.author.id, url, digest, key), url
+        finally:
+            _pending_memes.discard(key)
+        match = 'content'
+    metrics.inc('bot_meme_duplicates_total', match=match)
+    await ctx.send(f"♻️ **That meme is already in the collection as #{duplicate}.**")
+    return None
+
+# Shared state: when shards run in several processes, re-read the store whenever
+# another process committed to it and rebuild the in-memory views
+_shared_state_sync: Optional[asyncio.Task] = None
+_sync_cursor: Optional[Dict] = data.get('cursor')
+
+async def _sync_shared_state() -> None:
+    global _sync_cursor
+    force = False
+    while True:
+        generation = storage.generation
+        changes = await storage.load_changes(_sync_cursor, force)
+        if changes is None:
+            return
+        if storage.generation == generation:
+            break
+        force = True  # a local write was queued behind the read, read again
+    if 'full' in changes:
+        reload_shared_state(changes['full'])
+        _sync_cursor = changes['full']['cursor']
+        logger.info("🧩 Reloaded shared state from the store.")
+        return
+    # Our own writes come back too; the store and the ledger ignore repeats
+    digests = {meme_id: bytes.fromhex(digest) for digest, meme_id in changes['meme_hashes']}
+    for meme_id, user_id, url, created_at, url_key in changes['memes']:
+        index_meme(meme_id, int(user_id), url, created_at, digests.get(meme_id), url_key)
+    for meme_id, voter_id, value in changes['vote_log']:
+        apply_vote(meme_id, voter_id, value)
+    _sync_cursor = changes['cursor']
+    logger.debug(f"🧩 Synced {len(changes['memes'])} memes and {len(changes['vote_log'])} votes from the store.")
+
+# Only needed after a reset in another process or a long stall
+def reload_shared_state(data: Dict) -> None:
+    global votes
+    votes = load_votes(data)
+    meme_store.load(data['memes'], data['meme_hashes'])
+    meme_index.rebuild(categories, votes)
+    meme_search.rebuild(categories, meme_store.urls())
+    vote_ranking.rebuild(votes)
+    meme_ledger.load(data['meme_votes'])
+    profanity_filter.load(data['bad_words'])
+    trivia_games.load_scores(data['trivia_scores'])
+    guild_config.clear()
+
+async def sync_shared_state() -> None:
+    global _shared_state_sync
+    if not SHARED_STATE:
+        return
+    if _shared_state_sync is None or _shared_state_sync.done():
+        _shared_state_sync = asyncio.create_task(_sync_shared_state())
+    await asyncio.shield(_shared_state_sync)
+
+@tasks.loop(seconds=SHARED_STATE_SYNC_INTERVAL)
+async def sync_shared_state_loop():
+    try:
+        await sync_shared_state()
+    except Exception as e:
+        logger.error(f"🧩 Shared state sync failed: {e}")
+
 last_ccmeme_time = 0
 
 async def fetch_memes(url: str) -> List[str]:
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, headers=headers) as response:
-                logger.info(f"Fetching memes from {url}")
-                response.raise_for_status()
-                data = await response.json()
-                if 'data' in data:
-                    memes = [item['link'] for item in data['data'] if 'link' in item]
-                    return memes if memes else []
-                else:
-                    logger.warning("Invalid response format, 'data' key not found.")
-                    return []
-        except aiohttp.ClientResponseError as e:
-            logger.error(f'HTTP error occurred: {e.status} - {e.message}')
+    try:
+        upstream_logger.info(f"Fetching memes from {url}")
+        response = await http_client.fetch(url, headers=headers)
+        if response.status >= 400:
+            upstream_logger.error(f'HTTP error occurred: {response.status} - {response.reason}')
             return []
-        except Exception as e:
-            logger.error(f'An unexpected error occurred: {e}')
+        data = response.json()
+        if 'data' in data:
+            memes = [item['link'] for item in data['data'] if 'link' in item]
+            index_gallery_items(url, data['data'])
+            return memes if memes else []
+        else:
+            upstream_logger.warning("Invalid response format, 'data' key not found.")
             return []
+    except Exception as e:
+        upstream_logger.error(f'An unexpected error occurred: {e}')
+        return []
+
+# Fetched items are searchable by title, tags and the subreddit or query they came from
+def index_gallery_items(url: str, items: List[Dict]) -> None:
+    parts = urlsplit(url)
+    subreddit = re.search(r'/gallery/r/([^/]+)', parts.path)
+    source = ' '.join(parse_qs(parts.query).get('q', []) + ([subreddit.group(1)] if subreddit else []))
+    for item in items:
+        if 'link' in item:
+            tags = ' '.join(tag.get('name', '') for tag in item.get('tags') or [] if isinstance(tag, dict))
+            meme_search.add_fetched(item['link'], source, item.get('title') or '', tags)
+
+# Imgur gallery/search results cache (TTL + LRU, stale-while-revalidate)
+MEME_CACHE_TTL = float(os.getenv('MEME_CACHE_TTL', '300'))
+MEME_CACHE_MAX_STALE = float(os.getenv('MEME_CACHE_MAX_STALE', '3600'))
+MEME_CACHE_SIZE = int(os.getenv('MEME_CACHE_SIZE', '256'))
+MEME_PREWARM_MINUTES = float(os.getenv('MEME_PREWARM_MINUTES', '4'))
+
+class TTLCache:
+    def __init__(self, ttl: float, max_size: int, max_stale: float = 0):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    # Returns (value, is_fresh); (None, False) on a miss or once past max_stale
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.max_stale:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return value, age <= self.ttl
+
+    def set(self, key: str, value) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+meme_cache = TTLCache(MEME_CACHE_TTL, MEME_CACHE_SIZE, MEME_CACHE_MAX_STALE)
+_meme_refreshes: Dict[str, asyncio.Task] = {}
+
+async def refresh_memes(url: str) -> List[str]:
+    memes = await fetch_memes(url)
+    if memes:
+        meme_cache.set(url, memes)
+    return memes
 
-async def get_climate_change_memes() -> List[str]:
-    urls = [
-        'https://api.imgur.com/3/gallery/r/climatechange/hot',
-        'https://api.imgur.com/3/gallery/r/climate/hot',
-        'https://api.imgur.com/3/gallery/r/world/hot',
-        'https://api.imgur.com/3/gallery/r/environment/hot',
-        'https://api.imgur.com/3/gallery/r/sustainability/hot',
-        'https://api.imgur.com/3/gallery/r/ClimateActionPlan/hot',
-        'https://api.imgur.com/3/gallery/r/EcoFriendly/hot',
-        'https://api.imgur.com/3/gallery/r/globalwarming/hot',
-        'https://api.imgur.com/3/gallery/r/global/hot',
-        'https://api.imgur.com/3/gallery/r/change/hot'
-    ]
-    
-    all_memes = []
-    for url in urls:
-        memes = await fetch_memes(url)
-        all_memes.extend(memes)
+def _schedule_refresh(url: str) -> None:
+    if url in _meme_refreshes:
+        return
+    task = asyncio.create_task(refresh_memes(url))
+    _meme_refreshes[url] = task
+    task.add_done_callback(lambda _: _meme_refreshes.pop(url, None))
+
+async def fetch_memes_cached(url: str) -> List[str]:
+    memes, fresh = meme_cache.get(url)
+    if memes is None:
+        return await refresh_memes(url)
+    if not fresh:
+        _schedule_refresh(url)
+    return memes
+
+CLIMATE_MEME_URLS = [
+    f'{IMGUR_API_BASE}/3/gallery/r/climatechange/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/climate/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/world/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/environment/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/sustainability/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/ClimateActionPlan/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/EcoFriendly/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/globalwarming/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/global/hot',
+    f'{IMGUR_API_BASE}/3/gallery/r/change/hot'
+]
+
+# Fan-out settings for multi-gallery fetches
+FANOUT_CONCURRENCY = int(os.getenv('FANOUT_CONCURRENCY', '5'))
+FANOUT_DEADLINE = float(os.getenv('FANOUT_DEADLINE', '4'))
+SLOW_SOURCE_THRESHOLD = float(os.getenv('SLOW_SOURCE_THRESHOLD', '2'))
+
+# Smoothed latency per source URL (seconds), used to spot slow galleries
+source_latencies: Dict[str, float] = {}
+
+def record_source_latency(url: str, elapsed: float) -> None:
+    previous = source_latencies.get(url)
+    source_latencies[url] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+    if elapsed > SLOW_SOURCE_THRESHOLD:
+        upstream_logger.warning(f"🐢 Slow source {url}: {elapsed:.2f}s (avg {source_latencies[url]:.2f}s)")
+
+def slow_sources(threshold: float = SLOW_SOURCE_THRESHOLD) -> List[str]:
+    return sorted((url for url, avg in source_latencies.items() if avg > threshold),
+                  key=lambda url: source_latencies[url], reverse=True)
+
+async def fetch_memes_fanout(urls: List[str], concurrency: int = FANOUT_CONCURRENCY,
+                             deadline: float = FANOUT_DEADLINE, fetcher=None) -> List[str]:
+    fetcher = fetcher or fetch_memes_cached
+    semaphore = asyncio.Semaphore(concurrency)
+    # Known-slow galleries queue behind the others (fastest first) so they don't
+    # take the semaphore slots while quick sources wait on them
+    slow = slow_sources()
+    urls = [url for url in urls if url not in slow] + [url for url in reversed(slow) if url in urls]
+
+    async def fetch_one(url: str) -> List[str]:
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                return await fetcher(url)
+            finally:
+                record_source_latency(url, time.monotonic() - started)
+
+    started = time.monotonic()
+    pending_tasks = {asyncio.create_task(fetch_one(url)): url for url in urls}
+    done, pending = await asyncio.wait(pending_tasks, timeout=deadline)
+
+    for task in pending:
+        task.cancel()
+        upstream_logger.warning(f"⏱️ Deadline of {deadline}s hit, dropped {pending_tasks[task]}")
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
 
+    all_memes = []
+    for task in pending_tasks:
+        if task in done and task.exception() is None:
+            all_memes.extend(task.result())
+    upstream_logger.info(f"Fetched {len(done)}/{len(urls)} sources in {time.monotonic() - started:.2f}s")
     return all_memes
 
+async def get_climate_change_memes() -> List[str]:
+    return await fetch_memes_fanout(CLIMATE_MEME_URLS)
+
+@tasks.loop(minutes=MEME_PREWARM_MINUTES)
+async def prewarm_meme_cache():
+    memes = await fetch_memes_fanout(CLIMATE_MEME_URLS, fetcher=refresh_memes)
+    upstream_logger.info(f"♻️ Pre-warmed meme cache with {len(memes)} climate memes ({len(meme_cache)} entries).")
+    upstream_logger.info(f"🌐 Upstream requests: {http_client.issued} issued, {http_client.coalesced} coalesced.")
+
 async def get_ip_info(ip_addr: str) -> str:
-    url = f'https://api.api-ninjas.com/v1/iplookup?address={ip_addr}'
+    url = f'{NINJAS_API_BASE}/v1/iplookup?address={ip_addr}'
     headers = {'X-Api-Key': API_NINJAS_KEY}
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            if response.status == 200:
-                data = await response.json()
-                return (
-                    f"🌍 **IP Address:** {data.get('ip')}\n"
-                    f"🏳️ **Country-Code:** {data.get('country_code')}\n"
-                    f"🇺🇸 **Country:** {data.get('country')}\n"
-                    f"📍 **Region-Code:** {data.get('region_code')}\n"
-                    f"📍 **Region:** {data.get('region')}\n"
-                    f"🕒 **Timezone:** {data.get('timezone')}\n"
-                )
-            else:
-                return f"❗ Error: {response.status} - {response.reason}"
+    response = await http_client.fetch(url, headers=headers)
+    if response.status == 200:
+        data = response.json()
+        return (
+            f"🌍 **IP Address:** {data.get('ip')}\n"
+            f"🏳️ **Country-Code:** {data.get('country_code')}\n"
+            f"🇺🇸 **Country:** {data.get('country')}\n"
+            f"📍 **Region-Code:** {data.get('region_code')}\n"
+            f"📍 **Region:** {data.get('region')}\n"
+            f"🕒 **Timezone:** {data.get('timezone')}\n"
+        )
+    else:
+        return f"❗ Error: {response.status} - {response.reason}"
 
 @bot.command(name='ip')
+@upstream_cooldown('ninjas')
 async def ip_lookup(ctx: commands.Context, ip_addr: str):
     result = await get_ip_info(ip_addr)
     await ctx.send(f"🔍 **IP Lookup Result:**\n{result}")
 
 async def generate_password(length: int) -> str:
-    url = f'https://api.api-ninjas.com/v1/passwordgenerator?length={length}'
+    url = f'{NINJAS_API_BASE}/v1/passwordgenerator?length={length}'
     headers = {'X-Api-Key': API_NINJAS_KEY}
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            if response.status == 200:
-                data = await response.json()
-                return data.get('random_password', 'No password generated.')
-            else:
-                return f"❗ Error: {response.status} - {response.reason}"
+    # Never coalesce: concurrent callers must not receive the same password
+    response = await http_client.fetch(url, headers=headers, coalesce=False)
+    if response.status == 200:
+        data = response.json()
+        return data.get('random_password', 'No password generated.')
+    else:
+        return f"❗ Error: {response.status} - {response.reason}"
 
 @bot.command(name='password')
+@upstream_cooldown('ninjas')
 async def password_generator(ctx: commands.Context, length: int):
     if length < 1 or length > 128:
         await ctx.send("❗ Please enter a length between 1 and 128.")
@@ -208,21 +2715,21 @@ async def password_generator(ctx: commands.Context, length: int):
 # Function to fetch hobbies asynchronously
 async def fetch_hobbies(url: str) -> Dict[str, Optional[str]]:
     headers = {'X-Api-Key': API_NINJAS_KEY}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            if response.status == 200:
-                data = await response.json()
-                if isinstance(data, dict):  # Check if the response is a dictionary
-                    return data
-                else:
-                    logger.warning("Unexpected response format.")
-                    return {}
-            else:
-                logger.error(f"Failed to fetch data. Status code: {response.status}")
-                return {}
+    # Never coalesce: every caller should get its own random hobby
+    response = await http_client.fetch(url, headers=headers, coalesce=False)
+    if response.status == 200:
+        data = response.json()
+        if isinstance(data, dict):  # Check if the response is a dictionary
+            return data
+        else:
+            upstream_logger.warning("Unexpected response format.")
+            return {}
+    else:
+        upstream_logger.error(f"Failed to fetch data. Status code: {response.status}")
+        return {}
             
 async def get_hobby() -> Dict[str, str]:
-    url = "https://api.api-ninjas.com/v1/hobbies?category=general"
+    url = f"{NINJAS_API_BASE}/v1/hobbies?category=general"
     data = await fetch_hobbies(url)
     
     # Assuming the API response includes these fields
@@ -238,6 +2745,7 @@ async def get_hobby() -> Dict[str, str]:
 
 # Command to fetch and display a hobby
 @bot.command(name='hobby')
+@upstream_cooldown('ninjas')
 async def hobby(ctx: commands.Context):
     hobby_info = await get_hobby()
     hobby = hobby_info.get('hobby', 'No hobby found')
@@ -251,52 +2759,138 @@ async def hobby(ctx: commands.Context):
     )
     await ctx.send(response)
 
+# Facts kept from one API Ninjas response
+FACTS_PER_FETCH = 3
+
 async def get_random_facts() -> List[str]:
-    url = 'https://api.api-ninjas.com/v1/facts'
+    url = f'{NINJAS_API_BASE}/v1/facts'
     headers = {'X-Api-Key': API_NINJAS_KEY}
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, headers=headers) as response:
-                logger.info(f"Response Status Code: {response.status}")
-                response_text = await response.text()
-                logger.info(f"Response Text: {response_text}")
-
-                if response.status == 200:
-                    try:
-                        data = await response.json()
-                        if isinstance(data, list):
-                            return [fact['fact'] for fact in data if 'fact' in fact][:3]  # Fixed number of facts
-                        else:
-                            logger.warning("Unexpected response format, data is not a list.")
-                            return []
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON Decode Error: {e}")
-                        return []
+    try:
+        # Never coalesce: every call should bring back new random facts
+        response = await http_client.fetch(url, headers=headers, coalesce=False)
+        upstream_logger.debug(f"Facts response: {response.status} ({len(response.text)} bytes)")
+
+        if response.status == 200:
+            try:
+                data = response.json()
+                if isinstance(data, list):
+                    return [fact['fact'] for fact in data if 'fact' in fact][:FACTS_PER_FETCH]
                 else:
-                    logger.error(f"API Error: {response.status} - {response.reason}")
+                    upstream_logger.warning("Unexpected response format, data is not a list.")
                     return []
-        except aiohttp.ClientResponseError as e:
-            logger.error(f'HTTP error occurred: {e.status} - {e.message}')
-            return []
-        except Exception as e:
-            logger.error(f'An unexpected error occurred: {e}')
+            except json.JSONDecodeError as e:
+                upstream_logger.error(f"JSON Decode Error: {e}")
+                return []
+        else:
+            upstream_logger.error(f"API Error: {response.status} - {response.reason}")
             return []
+    except aiohttp.ClientResponseError as e:
+        upstream_logger.error(f'HTTP error occurred: {e.status} - {e.message}')
+        return []
+    except Exception as e:
+        upstream_logger.error(f'An unexpected error occurred: {e}')
+        return []
+
+# Facts are served from a buffer that is refilled in the background
+FACT_BUFFER_LOW = int(os.getenv('FACT_BUFFER_LOW', '10'))
+FACT_BUFFER_HIGH = int(os.getenv('FACT_BUFFER_HIGH', '30'))
+# A refill round never runs more fetches than the API Ninjas token bucket
+# holds, or the surplus would only come back as client-side 429s
+FACT_REFILL_CONCURRENCY = min(int(os.getenv('FACT_REFILL_CONCURRENCY', '4')),
+                              RATE_LIMITS[urlsplit(NINJAS_API_BASE).netloc][1])
+
+class FactBuffer:
+    def __init__(self, low: int, high: int, concurrency: int = FACT_REFILL_CONCURRENCY):
+        self.low = low
+        self.high = high
+        self.concurrency = concurrency
+        self._facts = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        # Resolved whenever a refill adds facts, for takers waiting on it
+        self._grew: Optional[asyncio.Future] = None
+        # Facts the waiting takers asked for in total
+        self._wanted = 0
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    def _add(self, new_facts: List[str]) -> None:
+        for item in new_facts:
+            if item not in self._facts:
+                self._facts.append(item)
+        if self._grew is not None and not self._grew.done():
+            self._grew.set_result(None)
+        self._grew = None
+
+    def _start_refill(self) -> asyncio.Task:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+        return self._refill_task
+
+    def ensure_refill(self) -> None:
+        if len(self._facts) < self.low:
+            self._start_refill()
+
+    # Each round runs the fetches still needed for the high mark or the waiting
+    # takers, at most concurrency of them, and each fetch wakes the takers as
+    # it lands. Upstream facts repeat now and then, so only a round that brings
+    # back nothing at all (errors, rate limiting) ends a refill.
+    async def _refill(self) -> None:
+        while len(self._facts) < max(self.high, self._wanted):
+            missing = max(self.high, self._wanted) - len(self._facts)
+            fetch_count = min(self.concurrency, -(-missing // FACTS_PER_FETCH))
+            fetches = [get_random_facts() for _ in range(fetch_count)]
+            fetched = False
+            for fetch in asyncio.as_completed(fetches):
+                new_facts = await fetch
+                if new_facts:
+                    fetched = True
+                    self._add(new_facts)
+            if not fetched:
+                logger.warning(f"📚 Fact refill stopped at {len(self._facts)} facts.")
+                return
+        logger.debug(f"📚 Fact buffer refilled to {len(self._facts)} facts.")
+
+    # Returns (facts, from_upstream); falls back to the local climate facts when empty
+    async def take(self, count: int) -> tuple:
+        # A cold or drained buffer waits on the one running refill instead of fetching itself
+        self._wanted += count
+        try:
+            while len(self._facts) < count:
+                refill = self._start_refill()
+                if self._grew is None:
+                    self._grew = asyncio.get_running_loop().create_future()
+                await asyncio.wait([self._grew, refill], return_when=asyncio.FIRST_COMPLETED)
+                if refill.done() and len(self._facts) < count:
+                    break
+        finally:
+            self._wanted -= count
+        taken = [self._facts.popleft() for _ in range(min(count, len(self._facts)))]
+        self.ensure_refill()
+        if taken:
+            return taken, True
+        return random.sample(facts, min(count, len(facts))), False
+
+fact_buffer = FactBuffer(FACT_BUFFER_LOW, FACT_BUFFER_HIGH)
 
 @bot.command(name='fact')
-@commands.cooldown(1, 5, commands.BucketType.user)
+@shared_cooldown(1, 5)
 async def fact(ctx: commands.Context, limit: int = 3):
     if limit < 1 or limit > 10:
         await ctx.send("❗ Please enter a limit between 1 and 10.")
         return
 
-    facts = await get_random_facts()
-    if facts:
-        # Apply the limit here by slicing the facts list
-        for fact in facts[:limit]:
-            await ctx.send(f"📚 **Fact:** {fact}")
-    else:
-        await ctx.send("❗ Sorry, I couldn't retrieve any facts right now.")
+    # Facts served from the buffer don't reach API Ninjas, only a short buffer
+    # does, and then it takes one request per FACTS_PER_FETCH facts
+    if len(fact_buffer) < limit:
+        await spend_upstream_budget(ctx, 'ninjas', -(-limit // FACTS_PER_FETCH))
+    selected, from_upstream = await fact_buffer.take(limit)
+    embed = discord.Embed(title="📚 Random Facts", description="\n".join(f"• {item}" for item in selected),
+                          color=discord.Color.green())
+    if not from_upstream:
+        embed.set_footer(text="Fact service is unavailable, here are some climate facts instead.")
+    await ctx.send(embed=embed)
 
 @bot.event
 async def on_ready():
@@ -316,15 +2910,46 @@ async def on_message(message):
     if message.author == bot.user:
         return
 
-    if any(bad_word in message.content.lower() for bad_word in ['stfu', 'fuck', 'shit', 'bitch', 'nigga', 'nigger', 'ass', 'mtf']):
+    if profanity_filter.contains_profanity(message.content, message.guild.id if message.guild else None):
         await message.delete()
         await message.channel.send(f"🚫 {message.author.mention}, that word is not allowed here.")
+        events_logger.info(f"🚫 Removed a filtered message in channel {message.channel.id}")
 
+    await trivia_games.answer(message)
     await bot.process_commands(message)
 
+@bot.command(name='addbadword')
+@commands.guild_only()
+@has_permissions(manage_messages=True)
+async def add_bad_word(ctx: commands.Context, *, word: str):
+    word = word.strip().casefold()
+    if not normalize_message(word).strip():
+        await ctx.send("❗ That word is empty once accents and marks are removed.")
+        return
+    words = profanity_filter.guild_words(ctx.guild.id)
+    words.append(word)
+    profanity_filter.set_guild_words(ctx.guild.id, words)
+    await storage.set_word_list(str(ctx.guild.id), profanity_filter.guild_words(ctx.guild.id))
+    await ctx.send("🚫 **Added a word to this server's filter.**")
+
+@bot.command(name='removebadword')
+@commands.guild_only()
+@has_permissions(manage_messages=True)
+async def remove_bad_word(ctx: commands.Context, *, word: str):
+    words = profanity_filter.guild_words(ctx.guild.id)
+    word = word.strip().casefold()
+    if word not in words:
+        await ctx.send("❗ That word is not in this server's filter.")
+        return
+    words.remove(word)
+    profanity_filter.set_guild_words(ctx.guild.id, words)
+    await storage.set_word_list(str(ctx.guild.id), words)
+    await ctx.send("✅ **Removed the word from this server's filter.**")
+
 @bot.command(name='feedback')
 async def feedback(ctx: commands.Context, *, feedback_message: str):
-    feedback_channel = bot.get_channel(int(FEEDBACK_CHANNEL_ID)) if FEEDBACK_CHANNEL_ID else None
+    config = await guild_config.get(ctx.guild.id) if ctx.guild else {}
+    feedback_channel = bot.get_channel(config.get('feedback_channel_id'))
     if feedback_channel:
         await feedback_channel.send(f"💬 **Feedback from {ctx.author}:** {feedback_message}")
         await ctx.send("✅ **Thank you for your feedback!**")
@@ -333,10 +2958,13 @@ async def feedback(ctx: commands.Context, *, feedback_message: str):
 
 @bot.command(name='mystats')
 async def my_stats(ctx: commands.Context):
-    user_id = str(ctx.author.id)
-    num_memes = len(user_memes.get(user_id, []))
+    await sync_shared_state()
+    user_id = ctx.author.id
+    num_memes = meme_store.count_of(user_id)
     num_votes = votes.get(user_id, 0)
-    await ctx.send(f"📊 **You have submitted {num_memes} memes and received {num_votes} votes.")
+    rank = vote_ranking.rank(user_id)
+    rank_text = f" You are ranked #{rank} of {len(vote_ranking)}." if rank else ""
+    await ctx.send(f"📊 **You have submitted {num_memes} memes and received {num_votes} votes.**{rank_text}")
 
 # Ban Command
 @bot.command(name='ban')
@@ -370,13 +2998,32 @@ async def kick_error(ctx, error):
 @bot.command(name='mute')
 @has_permissions(manage_roles=True)
 async def mute(ctx, member: Member, minutes: int = 5, *, reason=None):
-    role = await ensure_muted_role(ctx.guild)
+    role = await ensure_muted_role(ctx.guild, ctx.channel)
     await member.add_roles(role, reason=reason)
     await ctx.send(f"🔇 {member.mention} has been muted for {minutes} minutes for: {reason}")
-
-    await asyncio.sleep(minutes * 60)
-    await member.remove_roles(role)
-    await ctx.send(f"🔊 {member.mention}'s mute has been lifted.")
+    await scheduler.schedule(f'unmute:{ctx.guild.id}:{member.id}', 'unmute', minutes * 60, {
+        'guild_id': ctx.guild.id, 'member_id': member.id, 'channel_id': ctx.channel.id,
+    })
+
+@scheduler.handler('unmute')
+async def expire_mute(guild_id: int, member_id: int, channel_id: int):
+    await bot.wait_until_ready()
+    guild = bot.get_guild(guild_id)
+    if guild is None:
+        logger.warning(f"🔊 Cannot lift mute: guild {guild_id} not found.")
+        return
+    role = get_muted_role(guild)
+    member = guild.get_member(member_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(member_id)
+        except discord.NotFound:
+            return
+    if role and role in member.roles:
+        await member.remove_roles(role)
+        channel = bot.get_channel(channel_id)
+        if channel:
+            await channel.send(f"🔊 {member.mention}'s mute has been lifted.")
 
 @mute.error
 async def mute_error(ctx, error):
@@ -389,23 +3036,111 @@ async def mute_error(ctx, error):
 @bot.command(name='unmute')
 @has_permissions(manage_roles=True)
 async def unmute(ctx, member: Member):
-    role = discord.utils.get(ctx.guild.roles, name='Muted')
+    role = get_muted_role(ctx.guild)
     if role in member.roles:
         await member.remove_roles(role)
+        await scheduler.cancel(f'unmute:{ctx.guild.id}:{member.id}')
         await ctx.send(f"🔊 {member.mention} has been unmuted.")
     else:
         await ctx.send(f"❗ {member.mention} is not muted.")
 
+# Muted role lookups are cached per guild; channel overwrites are applied in the
+# background with bounded concurrency and resume from whatever is still missing
+MUTE_OVERWRITE_CONCURRENCY = int(os.getenv('MUTE_OVERWRITE_CONCURRENCY', '5'))
+MUTE_OVERWRITE_RETRIES = 3
+MUTE_PROGRESS_INTERVAL = 5.0
+
+muted_role_ids: Dict[int, int] = {}
+_muted_overwrites_done = set()
+_muted_overwrite_tasks: Dict[int, asyncio.Task] = {}
+
+def get_muted_role(guild: Guild) -> Optional[Role]:
+    role_id = muted_role_ids.get(guild.id)
+    role = guild.get_role(role_id) if role_id else None
+    if role is None:
+        role = discord.utils.get(guild.roles, name='Muted')
+        if role:
+            muted_role_ids[guild.id] = role.id
+    return role
+
+def _needs_mute_overwrite(channel, role: Role) -> bool:
+    overwrite = channel.overwrites_for(role)
+    return not (overwrite.speak is False and overwrite.send_messages is False and overwrite.add_reactions is False)
+
+async def _set_mute_overwrite(channel, role: Role) -> bool:
+    for attempt in range(MUTE_OVERWRITE_RETRIES):
+        try:
+            await channel.set_permissions(role, speak=False, send_messages=False, add_reactions=False)
+            return True
+        except discord.Forbidden:
+            return False
+        except discord.HTTPException as e:
+            # discord.py already waits out per-route 429s; this covers 5xx and exhausted retries
+            delay = getattr(e, 'retry_after', None) or (2 ** attempt + random.random())
+            logger.warning(f"Overwrite for #{channel} failed ({e.status}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    return False
+
+async def apply_muted_overwrites(guild: Guild, role: Role, status_channel=None) -> tuple:
+    pending = [channel for channel in guild.channels if _needs_mute_overwrite(channel, role)]
+    total = len(pending)
+    if not total:
+        _muted_overwrites_done.add(guild.id)
+        return 0, 0
+
+    semaphore = asyncio.Semaphore(MUTE_OVERWRITE_CONCURRENCY)
+    done = failed = 0
+    status = await status_channel.send(f"🔧 Setting up the Muted role in {total} channels...") if status_channel else None
+    last_report = time.monotonic()
+
+    async def apply(channel):
+        nonlocal done, failed, last_report
+        async with semaphore:
+            if await _set_mute_overwrite(channel, role):
+                done += 1
+            else:
+                failed += 1
+        if status and time.monotonic() - last_report >= MUTE_PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            await status.edit(content=f"🔧 Setting up the Muted role: {done + failed}/{total} channels...")
+
+    await asyncio.gather(*(apply(channel) for channel in pending))
+    if not failed:
+        _muted_overwrites_done.add(guild.id)
+    summary = f"🔧 Muted role applied to {done}/{total} channels."
+    if failed:
+        summary += f" {failed} failed and will be retried on the next mute."
+    logger.info(f"{summary} (guild {guild.id})")
+    if status:
+        await status.edit(content=summary)
+    return done, failed
+
+def _start_muted_overwrites(guild: Guild, role: Role, status_channel=None) -> None:
+    task = _muted_overwrite_tasks.get(guild.id)
+    if task and not task.done():
+        return
+    task = asyncio.create_task(apply_muted_overwrites(guild, role, status_channel))
+    _muted_overwrite_tasks[guild.id] = task
+    task.add_done_callback(lambda _: _muted_overwrite_tasks.pop(guild.id, None))
+
 # Function that automatically adds the "Muted" role
-async def ensure_muted_role(guild: Guild) -> Role:
-    role = discord.utils.get(guild.roles, name='Muted')
+async def ensure_muted_role(guild: Guild, status_channel=None) -> Role:
+    role = get_muted_role(guild)
     if not role:
         # "Muted" rolü oluşturuluyor
         role = await guild.create_role(name='Muted', reason="Mute komutu için otomatik oluşturuldu.")
-        for channel in guild.channels:
-            await channel.set_permissions(role, speak=False, send_messages=False, add_reactions=False)
+        muted_role_ids[guild.id] = role.id
+        _muted_overwrites_done.discard(guild.id)
+    if guild.id not in _muted_overwrites_done:
+        _start_muted_overwrites(guild, role, status_channel)
     return role
 
+@bot.event
+async def on_guild_channel_create(channel):
+    role = get_muted_role(channel.guild)
+    if role and _needs_mute_overwrite(channel, role):
+        await _set_mute_overwrite(channel, role)
+
 @unmute.error
 async def unmute_error(ctx, error):
     if isinstance(error, MissingPermissions):
@@ -414,70 +3149,67 @@ async def unmute_error(ctx, error):
         await ctx.send(f"❗ An error occurred: {str(error)}")
 
 @bot.command(name='meme')
-@commands.cooldown(1, 5, commands.BucketType.user)
+@shared_cooldown(1, 5)
 async def meme(ctx: commands.Context, category: str = None):
-    if category and category in categories:
-        meme_list = categories[category] + [meme for user_memes in user_memes.values() for meme in user_memes]
-    else:
-        meme_list = [meme for category_list in categories.values() for meme in category_list] + [meme for user_memes in user_memes.values() for meme in user_memes]
-    
-    if meme_list:
-        meme = random.choice(meme_list)
+    meme = meme_index.pick(category)
+    if meme:
         await ctx.send(f"🤣 **Random Meme:** {meme}")
     else:
         await ctx.send("❗ There are no memes in this category.")
 
 @bot.command(name='addmeme')
-@commands.cooldown(1, 10, commands.BucketType.user)
+@shared_cooldown(1, 10)
 async def add_meme(ctx: commands.Context, *, meme_url: str):
-    user_id = str(ctx.author.id)
-    if user_id not in user_memes:
-        user_memes[user_id] = []
-    user_memes[user_id].append(meme_url)
-    save_data({'user_memes': user_memes, 'votes': votes})
-    await ctx.send(f"✅ **Added your meme to the collection:** {meme_url}")
+    accepted = await accept_meme(ctx, meme_url)
+    if accepted:
+        meme_id, url = accepted
+        await ctx.send(f"✅ **Added your meme #{meme_id} to the collection:** {url}")
 
 @bot.command(name='submitmeme')
-@commands.cooldown(1, 10, commands.BucketType.user)
+@shared_cooldown(1, 10)
 async def submit_meme(ctx: commands.Context, *, meme_url: str):
-    user_id = ctx.author.id
-    if meme_url.startswith('http'):
-        if user_id not in user_memes:
-            user_memes[user_id] = []
-        user_memes[user_id].append(meme_url)
-        save_data({'user_memes': user_memes, 'votes': votes})
-        await ctx.send("✅ **Your meme has been submitted for voting!**")
-    else:
-        await ctx.send("❗ Please submit a valid URL.")
+    accepted = await accept_meme(ctx, meme_url)
+    if accepted:
+        meme_id, _ = accepted
+        await ctx.send(f"✅ **Your meme has been submitted for voting as #{meme_id}!** Vote with `!memevote {meme_id} 1`.")
 
 @bot.command(name='my_memes')
 async def my_memes(ctx: commands.Context):
-    user_id = ctx.author.id
-    if user_id in user_memes and user_memes[user_id]:
-        memes_list = '\n'.join(user_memes[user_id])
+    meme_ids = meme_store.memes_of(ctx.author.id)
+    if meme_ids:
+        memes_list = '\n'.join(f"#{meme_id} {meme_store.url(meme_id)} ({meme_ledger.score(meme_id)} votes)"
+                               for meme_id in meme_ids)
         await ctx.send(f"📸 **Memes you sent:**\n{memes_list}")
     else:
         await ctx.send("❗ There are no memes submitted yet.")
 
 @bot.command(name='memevote')
-@commands.cooldown(1, 10, commands.BucketType.user)
-async def meme_vote(ctx: commands.Context, user_id: int, vote: int):
-    user_id_str = str(user_id)
-    if user_id_str in user_memes:
-        if user_id_str not in votes:
-            votes[user_id_str] = 0
-        votes[user_id_str] += vote
-        save_data({'user_memes': user_memes, 'votes': votes})
-        await ctx.send(f"👍 **Your vote for user {user_id} has been counted.**")
-    else:
-        await ctx.send(f"❗ **User {user_id} has no memes.**")
+@shared_cooldown(1, 10)
+async def meme_vote(ctx: commands.Context, meme_id: int, vote: int):
+    await sync_shared_state()
+    owner = meme_store.owner(meme_id)
+    if owner is None:
+        await ctx.send(f"❗ **Meme #{meme_id} does not exist.**")
+        return
+    if owner == ctx.author.id:
+        await ctx.send("❗ **You can't vote for your own meme.**")
+        return
+    vote = max(-1, min(1, vote))
+    if meme_ledger.vote_of(meme_id, ctx.author.id) == vote:
+        await ctx.send(f"❗ **Your vote on meme #{meme_id} is already {vote}.**")
+        return
+    # Stored first, so a failed write leaves memory matching the database
+    await storage.cast_vote(meme_id, ctx.author.id, vote)
+    apply_vote(meme_id, ctx.author.id, vote)
+    await ctx.send(f"👍 **Your vote for meme #{meme_id} has been counted.**")
 
 @bot.command(name='topmeme')
 async def top_meme(ctx: commands.Context):
-    if votes:
-        top_user = max(votes.items(), key=votes.get)[0]
-        top_meme_url = random.choice(user_memes[top_user])
-        await ctx.send(f"🏆 **Top Meme:** {top_meme_url} with {votes[top_user]} votes!")
+    await sync_shared_state()
+    top = meme_ledger.top(1)
+    if top:
+        meme_id, score = top[0]
+        await ctx.send(f"🏆 **Top Meme:** #{meme_id} {meme_store.url(meme_id)} with {score} votes!")
     else:
         await ctx.send("❗ **No memes have been voted on yet.**")
 
@@ -493,13 +3225,13 @@ async def bot_help(ctx: commands.Context):
 
     👋 **!hi** - Say hello to the bot.
     🤣 **!meme [category]** - Get a random meme. Optionally specify a category to filter.
-    📝 **!addmeme [meme_url]** - Add a meme to the bot's collection.
+    📝 **!addmeme [meme_url]** - Add a meme to the bot's collection. Memes already in it are turned away.
     🗳️ **!submitmeme [meme_url]** - Submit a meme for voting.
     📸 **!my_memes** - View the memes you've submitted.
-    👍 **!memevote [user_id] [vote]** - Vote for a user's meme. The vote should be a positive or negative integer.
+    👍 **!memevote [meme_id] [vote]** - Vote for a meme: 1 for up, -1 for down, 0 to withdraw. One vote per meme.
     🏆 **!topmeme** - View the most voted meme.
     🌍 **!ClimateChange** - Get a random climate change fact.
-    🔍 **!searchmm [keyword]** - Search for memes on Imgur by keyword.
+    🔍 **!searchmm [keyword]** - Search our memes and fetched galleries by keyword, falling back to Imgur.
     🔑 **!password [length]** - Generate a random password with the specified length (1-128).
     🎨 **!hobby [category]** - Get a random hobby suggestion. Optionally specify a category.
     🌍 **!ip [ip_addr]** - Look up information about an IP address.
@@ -507,17 +3239,20 @@ async def bot_help(ctx: commands.Context):
     📚 **!fact [limit]** - Get random facts. Specify the number of facts (1-10).
     🌦️ **!weather [city]** - Get the current weather for a specified location.
     🧠 **!trivia [category]** - Get a random trivia question. Optionally specify a category.
+    🧠 **!triviascore** - Show your trivia points and this server's top players.
     🔄 **!resetvotes** - Reset all meme votes (admin only).
     🔄 **!resetdata** - Reset all user data and votes (admin only).
-    📢 **!setannouncementchannel [channel_id]** - Set the channel for meme announcements (admin only).
-    👋 **!welcome [channel_id]** - Set the welcome channel (admin only).
-    👋 **!goodbye [channel_id]** - Set the goodbye channel (admin only).
-    💬 **!setfeedback [channel_id]** - Set the feedback channel (admin only).
+    📢 **!setannouncementchannel [channel_id]** - Set this server's channel for meme announcements (admin only).
+    👋 **!welcome [channel_id]** - Set this server's welcome channel (admin only).
+    👋 **!goodbye [channel_id]** - Set this server's goodbye channel (admin only).
+    💬 **!setfeedback [channel_id]** - Set this server's feedback channel (admin only).
     🏆 **!leaderboard** - Show the top 5 users with the most votes.
     🚫 **!ban [member] [reason]** - Ban a user from the server.
     👢 **!kick [member] [reason]** - Kick a user from the server.
     🔇 **!mute [member] [minutes] [reason]** - Mute a user for a specified number of minutes.
     🔊 **!unmute [member]** - Unmute a user.
+    🚫 **!addbadword [word]** - Add a word to this server's filter (manage messages).
+    ✅ **!removebadword [word]** - Remove a word from this server's filter (manage messages).
     ❓ **!bot_help** - Show this help message.
     """
     await ctx.send(help_text)
@@ -529,13 +3264,13 @@ async def helpbot(ctx: commands.Context):
 
     👋 **!hi** - Say hello to the bot.
     🤣 **!meme [category]** - Get a random meme. Optionally specify a category to filter.
-    📝 **!addmeme [meme_url]** - Add a meme to the bot's collection.
+    📝 **!addmeme [meme_url]** - Add a meme to the bot's collection. Memes already in it are turned away.
     🗳️ **!submitmeme [meme_url]** - Submit a meme for voting.
     📸 **!my_memes** - View the memes you've submitted.
-    👍 **!memevote [user_id] [vote]** - Vote for a user's meme. The vote should be a positive or negative integer.
+    👍 **!memevote [meme_id] [vote]** - Vote for a meme: 1 for up, -1 for down, 0 to withdraw. One vote per meme.
     🏆 **!topmeme** - View the most voted meme.
     🌍 **!ClimateChange** - Get a random climate change fact.
-    🔍 **!searchmm [keyword]** - Search for memes on Imgur by keyword.
+    🔍 **!searchmm [keyword]** - Search our memes and fetched galleries by keyword, falling back to Imgur.
     🔑 **!password [length]** - Generate a random password with the specified length (1-128).
     🎨 **!hobby [category]** - Get a random hobby suggestion. Optionally specify a category.
     🌍 **!ip [ip_addr]** - Look up information about an IP address.
@@ -543,24 +3278,32 @@ async def helpbot(ctx: commands.Context):
     📚 **!fact [limit]** - Get random facts. Specify the number of facts (1-10).
     🌦️ **!weather [city]** - Get the current weather for a specified location.
     🧠 **!trivia [category]** - Get a random trivia question. Optionally specify a category.
+    🧠 **!triviascore** - Show your trivia points and this server's top players.
     🔄 **!resetvotes** - Reset all meme votes (admin only).
     🔄 **!resetdata** - Reset all user data and votes (admin only).
-    📢 **!setannouncementchannel [channel_id]** - Set the channel for meme announcements (admin only).
-    👋 **!welcome [channel_id]** - Set the welcome channel (admin only).
-    👋 **!goodbye [channel_id]** - Set the goodbye channel (admin only).
-    💬 **!setfeedback [channel_id]** - Set the feedback channel (admin only).
+    📢 **!setannouncementchannel [channel_id]** - Set this server's channel for meme announcements (admin only).
+    👋 **!welcome [channel_id]** - Set this server's welcome channel (admin only).
+    👋 **!goodbye [channel_id]** - Set this server's goodbye channel (admin only).
+    💬 **!setfeedback [channel_id]** - Set this server's feedback channel (admin only).
     🏆 **!leaderboard** - Show the top 5 users with the most votes.
     🚫 **!ban [member] [reason]** - Ban a user from the server.
     👢 **!kick [member] [reason]** - Kick a user from the server.
     🔇 **!mute [member] [minutes] [reason]** - Mute a user for a specified number of minutes.
     🔊 **!unmute [member]** - Unmute a user.
+    🚫 **!addbadword [word]** - Add a word to this server's filter (manage messages).
+    ✅ **!removebadword [word]** - Remove a word from this server's filter (manage messages).
     ❓ **!helpbot** - Show this help message.
     """
     await ctx.send(help_text)
 
 @bot.command(name='CCMeme')
-@commands.cooldown(1, 5, commands.BucketType.user)
+@shared_cooldown(1, 5)
 async def ccmeme(ctx: commands.Context):
+    # Galleries in the meme cache (kept warm by prewarm_meme_cache) don't reach
+    # Imgur; each one that isn't costs a request
+    missing = sum(1 for url in CLIMATE_MEME_URLS if meme_cache.get(url)[0] is None)
+    if missing:
+        await spend_upstream_budget(ctx, 'imgur', missing)
     memes = await get_climate_change_memes()
     if memes:
         meme_url = random.choice(memes)
@@ -568,98 +3311,214 @@ async def ccmeme(ctx: commands.Context):
     else:
         await ctx.send("❗ There was an error retrieving climate change memes or no memes were found.")
 
-def get_weather(city: str) -> str:
-    api_key = os.getenv('WEATHER_API_KEY')
-    url = f'http://api.weatherapi.com/v1/current.json?key={api_key}&q={city}'
-    
+# Weather lookups (async, cached per normalized city name)
+WEATHER_API_KEY = os.getenv('WEATHER_API_KEY', '')
+WEATHER_CACHE_TTL = float(os.getenv('WEATHER_CACHE_TTL', '600'))
+WEATHER_NEGATIVE_TTL = float(os.getenv('WEATHER_NEGATIVE_TTL', '3600'))
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', '512'))
+WEATHER_LOCATION_NOT_FOUND = 1006
+
+weather_cache = TTLCache(WEATHER_CACHE_TTL, WEATHER_CACHE_SIZE)
+unknown_cities = TTLCache(WEATHER_NEGATIVE_TTL, WEATHER_CACHE_SIZE)
+
+def normalize_city(city: str) -> str:
+    return ' '.join(city.split()).casefold()
+
+def format_weather(city: str, current: Dict) -> str:
+    return (f"🌡️ **Weather in {city}:**\n"
+            f"Temperature: {current['temp_c']}°C\n"
+            f"Condition: {current['condition']['text']}")
+
+# Whether get_weather can answer without calling WeatherAPI
+def weather_cached(city: str) -> bool:
+    key = normalize_city(city)
+    return weather_cache.get(key)[0] is not None or bool(unknown_cities.get(key)[0])
+
+async def get_weather(city: str) -> str:
+    key = normalize_city(city)
+    current, _ = weather_cache.get(key)
+    if current is not None:
+        return format_weather(city, current)
+    not_found, _ = unknown_cities.get(key)
+    if not_found:
+        return f"❗ No matching location found for '{city}'."
+
+    url = f'{WEATHER_API_BASE}/v1/current.json'
+    params = {'key': WEATHER_API_KEY, 'q': key}
     try:
-        response = requests.get(url)
-        response.raise_for_status()
+        response = await http_client.fetch(url, params=params)
         data = response.json()
-        return (f"🌡️ **Weather in {city}:**\n"
-                f"Temperature: {data['current']['temp_c']}°C\n"
-                f"Condition: {data['current']['condition']['text']}")
-    except requests.RequestException as e:
+        # Error bodies aren't always objects: "error" may be null, a string, or the body a list
+        error = data.get('error') if isinstance(data, dict) else None
+        if (response.status == 400 and isinstance(error, dict)
+                and error.get('code') == WEATHER_LOCATION_NOT_FOUND):
+            unknown_cities.set(key, True)
+            return f"❗ No matching location found for '{city}'."
+        if response.status != 200:
+            return f"❗ An error occurred while receiving weather data: {response.status} - {response.reason}"
+        current = data.get('current') if isinstance(data, dict) else None
+        if not isinstance(current, dict):
+            return "❗ An error occurred while receiving weather data: unexpected response format."
+        # Format before caching so a payload missing fields is never served from the cache
+        weather_info = format_weather(city, current)
+        weather_cache.set(key, current)
+        return weather_info
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
         return f"❗ An error occurred while receiving weather data: {e}"
 
 @bot.command(name='weather')
 async def weather(ctx: commands.Context, *, city: str):
-    weather_info = get_weather(city)
+    if not weather_cached(city):
+        await spend_upstream_budget(ctx, 'weather')
+    weather_info = await get_weather(city)
     await ctx.send(weather_info)
 
+# Trivia: one session per (channel, user), answered by a dict lookup in on_message;
+# timeouts go through the shared scheduler instead of a wait_for listener per game
+TRIVIA_TIMEOUT = float(os.getenv('TRIVIA_TIMEOUT', '30'))
+
+TRIVIA_QUESTIONS = [
+    ("What is the capital of France? 🇫🇷", "Paris"),
+    ("What is the largest planet in our solar system? 🌌", "Jupiter"),
+    ("Who wrote 'To Kill a Mockingbird'? 📚", "Harper Lee"),
+    ("What is the chemical symbol for gold? 🏅", "Au"),
+    ("In what year did the Titanic sink? 🚢", "1912"),
+    ("What is the hardest natural substance on Earth? 💎", "Diamond"),
+    ("Who painted the Mona Lisa? 🎨", "Leonardo da Vinci"),
+    ("What is the smallest country in the world? 🌍", "Vatican City"),
+    ("What element does 'O' represent on the periodic table? 🧪", "Oxygen"),
+    ("What planet is known as the Red Planet? 🔴", "Mars"),
+    ("Who is known as the father of modern physics? 👨‍🔬", "Albert Einstein"),
+    ("Which ocean is the largest? 🌊", "Pacific Ocean"),
+    ("What is the tallest mountain in the world? ⛰️", "Mount Everest"),
+    ("In which city would you find the Colosseum? 🏛️", "Rome"),
+    ("What year did World War II end? 🌍", "1945"),
+    ("Which planet is closest to the Sun? ☀️", "Mercury"),
+    ("Who wrote '1984'? 📖", "George Orwell"),
+    ("What is the capital of Japan? 🇯🇵", "Tokyo"),
+    ("How many continents are there on Earth? 🌎", "Seven"),
+    ("What is the largest mammal in the world? 🐋", "Blue Whale"),
+    ("Who was the first person to walk on the moon? 🌕", "Neil Armstrong"),
+    ("What is the currency of the United Kingdom? 💷", "Pound Sterling"),
+    ("What is the name of the longest river in the world? 🌊", "Nile"),
+    ("Who developed the theory of relativity? 🧠", "Albert Einstein"),
+    ("What is the chemical symbol for water? 💧", "H2O"),
+    ("What is the main ingredient in guacamole? 🥑", "Avocado"),
+    ("Which country is known as the Land of the Rising Sun? 🌅", "Japan"),
+    ("Who painted 'Starry Night'? 🌟", "Vincent van Gogh"),
+    ("What is the most abundant gas in Earth's atmosphere? 🌬️", "Nitrogen"),
+    ("What is the smallest planet in our solar system? 🪐", "Mercury"),
+    ("Who discovered penicillin? 💉", "Alexander Fleming"),
+    ("What is the name of the galaxy that contains our solar system? 🌌", "Milky Way"),
+    ("What is the capital city of Australia? 🐨", "Canberra"),
+    ("What is the symbol for potassium on the periodic table? 🧪", "K"),
+    ("What is the name of the phobia that involves an intense fear of spiders? 🕷️", "Arachnophobia"),
+    ("Which element is represented by the symbol 'Fe'? 🧪", "Iron"),
+    ("What fruit is known as the 'king of fruits' and has a strong odor? 🍍", "Durian"),
+    ("What is the chemical formula for table salt? 🧂", "NaCl"),
+    ("What is the name of the famous clock tower in London? ⏰", "Big Ben"),
+    ("What is the hardest natural substance found in the human body? 💪", "Tooth enamel"),
+    ("Who invented the light bulb? 💡", "Thomas Edison"),
+]
+
+class TriviaSession(NamedTuple):
+    question: int
+    token: int
+
+class TriviaGames:
+    def __init__(self, questions: List[tuple], timeout: float = TRIVIA_TIMEOUT):
+        self.questions = questions
+        self.answers = [answer.casefold() for _, answer in questions]
+        self.timeout = timeout
+        self._sessions: Dict[tuple, TriviaSession] = {}
+        self._tokens = 0
+        self._scores: Dict[str, VoteRanking] = {}
+
+    def load_scores(self, scores: Dict[str, Dict[str, int]]) -> None:
+        self._scores = {}
+        for guild_id, guild_scores in scores.items():
+            self._scores[str(guild_id)] = ranking = VoteRanking()
+            ranking.rebuild(guild_scores)
+
+    def scores_snapshot(self) -> Dict[str, Dict[int, int]]:
+        return {guild_id: ranking.scores() for guild_id, ranking in self._scores.items()}
+
+    def ranking(self, guild_id) -> VoteRanking:
+        return self._scores.setdefault(str(guild_id), VoteRanking())
+
+    async def start(self, channel_id: int, user_id: int) -> str:
+        self._tokens += 1
+        session = TriviaSession(random.randrange(len(self.questions)), self._tokens)
+        self._sessions[(channel_id, user_id)] = session
+        await scheduler.schedule(f'trivia:{channel_id}:{user_id}', 'trivia_timeout', self.timeout,
+                                 {'channel_id': channel_id, 'user_id': user_id, 'token': session.token},
+                                 persist=False)
+        return self.questions[session.question][0]
+
+    async def answer(self, message) -> bool:
+        key = (message.channel.id, message.author.id)
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return False
+        await scheduler.cancel(f'trivia:{key[0]}:{key[1]}')
+        question, correct_answer = self.questions[session.question]
+        if message.content.strip().casefold() == self.answers[session.question]:
+            guild_id = str(message.guild.id) if message.guild else '0'
+            ranking = self.ranking(guild_id)
+            user_id = message.author.id
+            ranking.update(user_id, ranking.score(user_id) + 1)
+            await storage.add_trivia_point(guild_id, str(user_id))
+            await message.channel.send(f"**✅ Correct!** The answer to \"{question}\" is indeed {correct_answer}.")
+        else:
+            await message.channel.send(f"**❌ Wrong!** The correct answer to \"{question}\" is {correct_answer}.")
+        return True
+
+    def expire(self, channel_id: int, user_id: int, token: int) -> bool:
+        session = self._sessions.get((channel_id, user_id))
+        if session is None or session.token != token:
+            return False
+        del self._sessions[(channel_id, user_id)]
+        return True
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+trivia_games = TriviaGames(TRIVIA_QUESTIONS)
+trivia_games.load_scores(data.get('trivia_scores', {}))
+
+@scheduler.handler('trivia_timeout')
+async def trivia_timeout(channel_id: int, user_id: int, token: int):
+    if trivia_games.expire(channel_id, user_id, token):
+        channel = bot.get_channel(channel_id)
+        if channel:
+            await channel.send(f"**⏳ Time's up!** <@{user_id}>, you took too long to answer.")
+
 @bot.command(name='trivia')
 async def trivia(ctx: commands.Context):
-    trivia_data = {
-        "What is the capital of France? 🇫🇷": "Paris",
-        "What is the largest planet in our solar system? 🌌": "Jupiter",
-        "Who wrote 'To Kill a Mockingbird'? 📚": "Harper Lee",
-        "What is the chemical symbol for gold? 🏅": "Au",
-        "In what year did the Titanic sink? 🚢": "1912",
-        "What is the hardest natural substance on Earth? 💎": "Diamond",
-        "Who painted the Mona Lisa? 🎨": "Leonardo da Vinci",
-        "What is the smallest country in the world? 🌍": "Vatican City",
-        "What element does 'O' represent on the periodic table? 🧪": "Oxygen",
-        "What planet is known as the Red Planet? 🔴": "Mars",
-        "Who is known as the father of modern physics? 👨‍🔬": "Albert Einstein",
-        "Which ocean is the largest? 🌊": "Pacific Ocean",
-        "What is the tallest mountain in the world? ⛰️": "Mount Everest",
-        "In which city would you find the Colosseum? 🏛️": "Rome",
-        "What year did World War II end? 🌍": "1945",
-        "Which planet is closest to the Sun? ☀️": "Mercury",
-        "Who wrote '1984'? 📖": "George Orwell",
-        "What is the capital of Japan? 🇯🇵": "Tokyo",
-        "How many continents are there on Earth? 🌎": "Seven",
-        "What is the largest mammal in the world? 🐋": "Blue Whale",
-        "Who was the first person to walk on the moon? 🌕": "Neil Armstrong",
-        "What is the currency of the United Kingdom? 💷": "Pound Sterling",
-        "What is the name of the longest river in the world? 🌊": "Nile",
-        "Who developed the theory of relativity? 🧠": "Albert Einstein",
-        "What is the chemical symbol for water? 💧": "H2O",
-        "What is the main ingredient in guacamole? 🥑": "Avocado",
-        "Which country is known as the Land of the Rising Sun? 🌅": "Japan",
-        "Who painted 'Starry Night'? 🌟": "Vincent van Gogh",
-        "What is the most abundant gas in Earth's atmosphere? 🌬️": "Nitrogen",
-        "What is the smallest planet in our solar system? 🪐": "Mercury",
-        "Who discovered penicillin? 💉": "Alexander Fleming",
-        "What is the name of the galaxy that contains our solar system? 🌌": "Milky Way",
-        "What is the capital city of Australia? 🐨": "Canberra",
-        "What is the symbol for potassium on the periodic table? 🧪": "K",
-        "What is the name of the phobia that involves an intense fear of spiders? 🕷️": "Arachnophobia",
-        "Which element is represented by the symbol 'Fe'? 🧪": "Iron",
-        "What fruit is known as the 'king of fruits' and has a strong odor? 🍍": "Durian",
-        "What is the chemical formula for table salt? 🧂": "NaCl",
-        "What is the name of the famous clock tower in London? ⏰": "Big Ben",
-        "What is the hardest natural substance found in the human body? 💪": "Tooth enamel",
-        "Who invented the light bulb? 💡": "Thomas Edison"
-    }
-
-    # Choose a random question
-    question, correct_answer = random.choice(list(trivia_data.items()))
-    
-    # Ask the question
+    question = await trivia_games.start(ctx.channel.id, ctx.author.id)
     await ctx.send(f"**📝 Question:** {question}\nReply with your answer!")
 
-    # Wait for the user's response
-    def check(m):
-        return m.author == ctx.author and m.channel == ctx.channel
-
-    try:
-        msg = await bot.wait_for('message', timeout=30.0, check=check)
-        user_answer = msg.content.strip()
-        
-        if user_answer.lower() == correct_answer.lower():
-            await ctx.send(f"**✅ Correct!** The answer to \"{question}\" is indeed {correct_answer}.")
-        else:
-            await ctx.send(f"**❌ Wrong!** The correct answer to \"{question}\" is {correct_answer}.")
-    
-    except asyncio.TimeoutError:
-        await ctx.send("**⏳ Time's up!** You took too long to answer.")
+@bot.command(name='triviascore')
+@commands.guild_only()
+async def trivia_score(ctx: commands.Context):
+    ranking = trivia_games.ranking(ctx.guild.id)
+    user_id = ctx.author.id
+    rank = ranking.rank(user_id)
+    top = "\n".join(f"{index}. <@{member_id}>: {score}" for index, (member_id, score) in enumerate(ranking.top(5), 1))
+    rank_text = f" (#{rank} of {len(ranking)})" if rank else ""
+    await ctx.send(f"🧠 **You have {ranking.score(user_id)} trivia points{rank_text}.**\n{top}")
 
 @bot.command(name='searchmm')
-@commands.cooldown(1, 5, commands.BucketType.user)
+@shared_cooldown(1, 5)
 async def searchmm(ctx: commands.Context, *, keyword: str):
-    url = f'https://api.imgur.com/3/gallery/search?q={keyword}'
-    memes = await fetch_memes(url)
+    memes = meme_search.search(keyword)
+    if len(memes) >= MEME_SEARCH_MIN_RESULTS:
+        metrics.inc('bot_meme_search_total', source='local')
+    else:
+        await spend_upstream_budget(ctx, 'imgur')
+        metrics.inc('bot_meme_search_total', source='imgur')
+        url = f'{IMGUR_API_BASE}/3/gallery/search?q={keyword}'
+        memes = await fetch_memes_cached(url) or memes
     if memes:
         meme_url = random.choice(memes)
         await ctx.send(f"🔍 **Here's a random meme for you to search:** {meme_url}")
@@ -668,44 +3527,49 @@ async def searchmm(ctx: commands.Context, *, keyword: str):
 
 @tasks.loop(hours=24)
 async def announce_top_meme():
-    if announcement_channel_id:
-        channel = bot.get_channel(announcement_channel_id)
+    await sync_shared_state()
+    top = meme_ledger.top(1)
+    top_user = meme_store.owner(top[0][0]) if top else None
+    top_meme = meme_store.url(top[0][0]) if top else None
+    for guild in bot.guilds:
+        channel_id = (await guild_config.get(guild.id)).get('announcement_channel_id')
+        if not channel_id:
+            continue
+        channel = bot.get_channel(channel_id)
         if channel:
-            top_user = max(votes.items(), key=lambda item: item[1], default=(None, 0))[0]
-            if top_user and top_user in user_memes:
-                top_meme = random.choice(user_memes[top_user])
+            if top_meme:
                 await channel.send(f"🏆 **Top meme of the hour by user {top_user}:** {top_meme}")
             else:
                 await channel.send("❗ No memes to announce.")
         else:
-            logger.warning("📢 Announcement channel not found.")
+            logger.warning(f"📢 Announcement channel not found in guild {guild.id}.")
 
 @bot.command(name='setannouncementchannel')
+@commands.guild_only()
 @commands.has_permissions(administrator=True)
 async def set_announcement_channel(ctx: commands.Context):
-    global announcement_channel_id
-    announcement_channel_id = ctx.channel.id
+    await guild_config.set(ctx.guild.id, 'announcement_channel_id', ctx.channel.id)
     await ctx.send(f"📢 **Announcement channel set to {ctx.channel.name}**")
 
 @bot.command(name='welcome')
+@commands.guild_only()
 @commands.has_permissions(administrator=True)
 async def set_welcome_channel(ctx: commands.Context):
-    global WELCOME_CHANNEL_ID
-    WELCOME_CHANNEL_ID = ctx.channel.id
+    await guild_config.set(ctx.guild.id, 'welcome_channel_id', ctx.channel.id)
     await ctx.send(f"👋 **Welcome channel set to {ctx.channel.name}**")
 
 @bot.command(name='goodbye')
+@commands.guild_only()
 @commands.has_permissions(administrator=True)
 async def set_goodbye_channel(ctx: commands.Context):
-    global GOODBYE_CHANNEL_ID
-    GOODBYE_CHANNEL_ID = ctx.channel.id
+    await guild_config.set(ctx.guild.id, 'goodbye_channel_id', ctx.channel.id)
     await ctx.send(f"👋 **Goodbye channel set to {ctx.channel.name}**")
 
 @bot.command(name='setfeedback')
+@commands.guild_only()
 @commands.has_permissions(administrator=True)
 async def set_feedback(ctx: commands.Context):
-    global FEEDBACK_CHANNEL_ID
-    FEEDBACK_CHANNEL_ID = ctx.channel.id
+    await guild_config.set(ctx.guild.id, 'feedback_channel_id', ctx.channel.id)
     await ctx.send(f"💬 **Feedback channel set to {ctx.channel.name}**")
 
 @bot.command(name='resetvotes')
@@ -713,11 +3577,23 @@ async def set_feedback(ctx: commands.Context):
 async def reset_votes(ctx: commands.Context):
     global votes
     votes = {}
-    save_data({'user_memes': user_memes, 'votes': votes})
+    meme_index.reset_votes()
+    vote_ranking.clear()
+    meme_ledger.reset_votes()
+    await storage.reset_votes()
     await ctx.send("🔄 **Votes have been reset.**")
 
 @bot.event
 async def on_command_error(ctx, error):
+    # spend_upstream_budget raises from inside the command
+    if isinstance(error, commands.CommandInvokeError) and isinstance(error.original, commands.CommandOnCooldown):
+        error = error.original
+    command_name = ctx.command.qualified_name if ctx.command else 'unknown'
+    if isinstance(error, commands.CommandOnCooldown):
+        metrics.inc('bot_command_cooldown_rejections_total', command=command_name)
+    else:
+        metrics.inc('bot_command_errors_total', command=command_name, error=type(error).__name__)
+
     if isinstance(error, commands.CommandOnCooldown):
         await ctx.send(f"⏳ This command is on cooldown. Please try again in {error.retry_after:.2f} seconds.")
     elif isinstance(error, commands.MissingRequiredArgument):
@@ -734,34 +3610,89 @@ async def on_command_error(ctx, error):
 
 @bot.command(name='leaderboard')
 async def leaderboard(ctx: commands.Context):
-    sorted_votes = sorted(votes.items(), key=lambda item: item[1], reverse=True)
-    leaderboard = "\n".join([f"{user}: {vote} votes" for user, vote in sorted_votes[:5]])
+    await sync_shared_state()
+    leaderboard = "\n".join([f"{user}: {vote} votes" for user, vote in vote_ranking.top(5)])
     await ctx.send(f"🏆 **Meme Leaderboard** 🏆\n{leaderboard}")
 
 @bot.event
 async def on_member_join(member):
-    welcome_channel = bot.get_channel(WELCOME_CHANNEL_ID)
+    config = await guild_config.get(member.guild.id)
+    welcome_channel = bot.get_channel(config.get('welcome_channel_id'))
     if welcome_channel:
         await welcome_channel.send(f"👋 **Welcome {member.mention} to our server!**")
     else:
-        logger.warning("👋 Welcome channel is not set.")
+        events_logger.warning("👋 Welcome channel is not set.")
 
 @bot.event
 async def on_member_remove(member):
-    goodbye_channel = bot.get_channel(GOODBYE_CHANNEL_ID)
+    config = await guild_config.get(member.guild.id)
+    goodbye_channel = bot.get_channel(config.get('goodbye_channel_id'))
     if goodbye_channel:
         await goodbye_channel.send(f"👋 **Goodbye {member.mention}, we'll miss you!**")
     else:
-        logger.warning("👋 Goodbye channel is not set.")
+        events_logger.warning("👋 Goodbye channel is not set.")
 
 @bot.command(name='resetdata')
 @commands.has_permissions(administrator=True)
 async def reset_data(ctx: commands.Context):
-    global user_memes, votes
-    user_memes = {}
+    global votes
     votes = {}
-    save_data({'user_memes': user_memes, 'votes': votes})
+    meme_store.clear()
+    meme_index.rebuild(categories, votes)
+    meme_search.rebuild(categories, meme_store.urls())
+    vote_ranking.clear()
+    meme_ledger.reset_votes()
+    await storage.reset_all()
     await ctx.send("🔄 **All user data has been reset.**")
 
+# Multi-process sharding: the parent process only supervises one worker per shard range
+def shard_ranges(count: int, processes: int) -> List[range]:
+    per_process = -(-count // processes)
+    return [range(start, min(start + per_process, count)) for start in range(0, count, per_process)]
+
+def recommended_shard_count() -> int:
+    async def fetch() -> int:
+        async with aiohttp.ClientSession() as session:
+            async with session.get('https://discord.com/api/v10/gateway/bot',
+                                   headers={'Authorization': f'Bot {BOT_TOKEN}'}) as response:
+                response.raise_for_status()
+                return (await response.json())['shards']
+    return asyncio.run(fetch())
+
+def spawn_shard_worker(index: int, shards: range, count: int) -> subprocess.Popen:
+    env = dict(os.environ, SHARD_COUNT=str(count), SHARD_IDS=f'{shards.start}-{shards.stop - 1}',
+               SHARD_PROCESSES='1')
+    if METRICS_PORT:
+        env['METRICS_PORT'] = str(METRICS_PORT + index)
+    logger.info(f"🧩 Starting worker {index} for shards {shards.start}-{shards.stop - 1} of {count}.")
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+
+def run_shard_workers() -> None:
+    count = shard_count or recommended_shard_count()
+    ranges = shard_ranges(count, min(SHARD_PROCESSES, count))
+    # The workers open the database themselves; the JSON import already ran here
+    asyncio.run(storage.close())
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    workers = [spawn_shard_worker(index, shards, count) for index, shards in enumerate(ranges)]
+    try:
+        while True:
+            time.sleep(1)
+            for index, worker in enumerate(workers):
+                code = worker.poll()
+                if code is not None:
+                    logger.error(f"🧩 Worker {index} exited with code {code}, restarting in {SHARD_WORKER_RESTART_DELAY}s.")
+                    time.sleep(SHARD_WORKER_RESTART_DELAY)
+                    workers[index] = spawn_shard_worker(index, ranges[index], count)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
 if __name__ == '__main__':
-    bot.run('')
+    if SHARD_PROCESSES > 1 and shard_ids is None:
+        run_shard_workers()
+    else:
+        bot.run(BOT_TOKEN, log_handler=None)
@@ -0,0 +1,9 @@
+# The bot reads its configuration at import time, so the tests give it dummy
+# credentials and an in-memory database before anything imports it
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+for name in ('IMGUR_CLIENT_ID', 'API_NINJAS_KEY', 'BOT_TOKEN'):
+    os.environ.setdefault(name, 'test')
+os.environ.setdefault('DB_FILE', ':memory:')
@@ -0,0 +1,28 @@
+import asyncio
+
+import bot
+
+
+def test_take_cooldown_charges_cost():
+    assert bot.take_cooldown(None, 5, 60, 0.0, cost=4) == (0.0, 60.0, 4)
+    assert bot.take_cooldown((60.0, 4), 5, 60, 1.0, cost=2) == (59.0, 60.0, 4)
+    assert bot.take_cooldown((60.0, 4), 5, 60, 1.0) == (0.0, 60.0, 5)
+
+
+def test_cost_above_rate_takes_whole_window():
+    assert bot.take_cooldown(None, 2, 60, 0.0, cost=4) == (0.0, 60.0, 2)
+
+
+def test_hit_charges_all_limits_or_none():
+    backend = bot.CooldownBackend()
+    limits = [('guild', 10, 60, True), ('global', 3, 60, True)]
+
+    async def main():
+        assert await backend.hit(limits, 2) is None
+        rejected = await backend.hit(limits, 2)
+        assert rejected[0] == 1 and 0 < rejected[1] <= 60
+        assert await backend.hit(limits) is None
+
+    asyncio.run(main())
+    assert backend._windows['guild'][1] == 3
+    assert backend._windows['global'][1] == 3
@@ -0,0 +1,42 @@
+import asyncio
+import itertools
+
+import bot
+
+
+def test_refill_rounds_never_exceed_concurrency(monkeypatch):
+    counter = itertools.count()
+    running = [0, 0]  # now, most at once
+
+    async def get_random_facts():
+        running[0] += 1
+        running[1] = max(running)
+        await asyncio.sleep(0.001)
+        running[0] -= 1
+        return [f'fact {next(counter)}' for _ in range(bot.FACTS_PER_FETCH)]
+
+    monkeypatch.setattr(bot, 'get_random_facts', get_random_facts)
+    buffer = bot.FactBuffer(10, 30, concurrency=4)
+
+    async def main():
+        return await asyncio.gather(*(buffer.take(10) for _ in range(40)))
+
+    results = asyncio.run(main())
+    assert running[1] == 4
+    assert all(from_upstream and len(taken) == 10 for taken, from_upstream in results)
+    served = [item for taken, _ in results for item in taken]
+    assert len(set(served)) == len(served)
+
+
+def test_refill_stops_on_an_empty_round(monkeypatch):
+    calls = []
+
+    async def get_random_facts():
+        calls.append(1)
+        return []
+
+    monkeypatch.setattr(bot, 'get_random_facts', get_random_facts)
+    buffer = bot.FactBuffer(10, 30, concurrency=4)
+    taken, from_upstream = asyncio.run(buffer.take(5))
+    assert not from_upstream and len(taken) == 5
+    assert len(calls) == 4
@@ -0,0 +1,49 @@
+import bot
+
+
+def brute_find(values, target):
+    running = 0
+    for index, value in enumerate(values):
+        running += value
+        if running > target:
+            return index
+    raise AssertionError('target out of range')
+
+
+def test_find_matches_prefix_sums():
+    values = [3, 0, 5, 1, 0, 2, 7]
+    tree = bot.FenwickTree(capacity=4)
+    for index, value in enumerate(values):
+        tree.set(index, value)
+    assert tree.total == sum(values)
+    for target in range(tree.total):
+        assert tree.find(target) == brute_find(values, target)
+
+
+def test_set_replaces_value():
+    tree = bot.FenwickTree()
+    tree.set(2, 5)
+    tree.set(2, 1)
+    tree.set(0, 1)
+    assert tree.total == 2
+    assert tree.find(0) == 0
+    assert tree.find(1) == 2
+
+
+def test_zero_weight_slots_are_never_found():
+    tree = bot.FenwickTree()
+    tree.set(0, 2)
+    tree.set(1, 4)
+    tree.set(0, 0)
+    assert {tree.find(target) for target in range(tree.total)} == {1}
+
+
+def test_growth_keeps_existing_weights():
+    tree = bot.FenwickTree(capacity=2)
+    tree.set(0, 1)
+    tree.set(1, 2)
+    tree.set(40, 3)
+    values = [1, 2] + [0] * 38 + [3]
+    assert tree.total == 6
+    for target in range(tree.total):
+        assert tree.find(target) == brute_find(values, target)
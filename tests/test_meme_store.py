@@ -0,0 +1,79 @@
+import bot
+
+
+def url(n):
+    return f'https://i.imgur.com/m{n:06d}.jpg'
+
+
+def test_add_and_lookup():
+    store = bot.MemeStore()
+    assert store.add(1, '42', url(1), 1.7e9)
+    assert store.owner(1) == 42
+    assert store.url(1) == url(1)
+    assert store.created_at(1) == 1700000000
+    assert store.owner(2) is None
+    assert store.url(2) is None
+    assert len(store) == 1
+
+
+def test_duplicate_id_is_rejected():
+    store = bot.MemeStore()
+    assert store.add(5, 1, url(5), 0)
+    assert not store.add(5, 2, url(6), 0)
+    assert store.owner(5) == 1
+    assert len(store) == 1
+    assert store.find_url(url(6)) is None
+
+
+def test_out_of_order_ids_stay_sorted():
+    store = bot.MemeStore()
+    for meme_id in (10, 30, 20, 5, 25):
+        assert store.add(meme_id, meme_id % 2, url(meme_id), meme_id)
+    assert not store.add(20, 0, url(99), 0)
+    assert [row[0] for row in store.meme_rows()] == [5, 10, 20, 25, 30]
+    for meme_id in (5, 10, 20, 25, 30):
+        assert store.url(meme_id) == url(meme_id)
+        assert store.created_at(meme_id) == meme_id
+    assert list(store.memes_of(0)) == [10, 20, 30]
+    assert list(store.memes_of(1)) == [5, 25]
+
+
+def test_table_grows_past_initial_slots():
+    store = bot.MemeStore()
+    count = 5000
+    for meme_id in range(1, count + 1):
+        store.add(meme_id, meme_id % 7, url(meme_id), 0)
+    assert len(store._slots) >= 2 * count
+    for meme_id in range(1, count + 1):
+        assert store.find_url(url(meme_id)) == meme_id
+        assert store.url(meme_id) == url(meme_id)
+    assert store.find_url(url(count + 1)) is None
+
+
+def test_reposted_url_is_interned_once_and_finds_first_meme():
+    store = bot.MemeStore()
+    store.add(1, 1, url(1), 0)
+    store.add(2, 2, url(1), 0)
+    assert store.find_url(url(1)) == 1
+    assert list(store.urls()) == [url(1)]
+    assert len(store._offsets) == 2
+
+
+def test_posted_url_is_not_a_key_when_a_key_was_given():
+    store = bot.MemeStore()
+    store.add(1, 1, 'https://imgur.com/abcdefg', 0, url_key='https://i.imgur.com/abcdefg.jpg')
+    assert store.find_url('https://i.imgur.com/abcdefg.jpg') == 1
+    assert store.find_url('https://imgur.com/abcdefg') is None
+
+
+def test_load_round_trips_rows_and_hashes():
+    rows = [[3, '7', url(3), 30, None], [1, '8', url(1), 10, 'key-1'], [2, '7', url(3), 20, None]]
+    store = bot.MemeStore()
+    store.load(rows, [['ab' * 16, 2]])
+    assert store.meme_rows() == sorted(rows)
+    assert store.find_content(bytes.fromhex('ab' * 16)) == 2
+    assert store.hash_rows() == [['ab' * 16, 2]]
+    assert store.find_url('key-1') == 1
+    assert store.find_url(url(3)) == 2
+    assert store.count_of(7) == 2
+    assert sorted(store.owners()) == [7, 8]
@@ -0,0 +1,46 @@
+import pytest
+
+import bot
+
+
+@pytest.mark.parametrize('url, key', [
+    ('https://imgur.com/AbCdE12', 'https://i.imgur.com/AbCdE12.jpg'),
+    ('https://m.imgur.com/AbCdE12.png?x=1', 'https://i.imgur.com/AbCdE12.jpg'),
+    ('http://i.imgur.com/AbCdE12.gifv', 'https://i.imgur.com/AbCdE12.mp4'),
+    ('https://www.imgur.com/gallery/XyZ', 'https://imgur.com/gallery/XyZ'),
+    ('https://cdn.discordapp.com/attachments/1/2/a.png?ex=1&is=2&hm=3', 'https://cdn.discordapp.com/attachments/1/2/a.png'),
+    ('https://media.discordapp.net/attachments/1/2/a.png?width=10', 'https://cdn.discordapp.com/attachments/1/2/a.png'),
+    ('HTTP://WWW.Example.com/a/b/?utm_source=x&b=2&fbclid=y&a=1#frag', 'http://example.com/a/b?a=1&b=2'),
+    ('http://example.com:8080', 'http://example.com:8080/'),
+    ('<https://i.redd.it/abc.jpg>', 'https://i.redd.it/abc.jpg'),
+])
+def test_canonicalize_url(url, key):
+    assert bot.canonicalize_url(url) == key
+
+
+@pytest.mark.parametrize('url', ['not a url', 'ftp://x.com/a', 'https://', 'http://[::1', 'https://x.com:99999/'])
+def test_canonicalize_url_rejects_invalid(url):
+    assert bot.canonicalize_url(url) is None
+
+
+@pytest.mark.parametrize('url', ['https://imgur.com/upload', 'https://imgur.com/about', 'https://imgur.com/signin'])
+def test_imgur_pages_are_not_image_ids(url):
+    assert bot.canonicalize_url(url) == url
+
+
+def test_url_variants():
+    assert bot.url_variants('https://i.imgur.com/AbCdE12.jpg') == [
+        'https://i.imgur.com/AbCdE12.jpg', 'https://i.imgur.com/AbCdE12.mp4']
+    assert bot.url_variants('http://example.com/a') == ['http://example.com/a', 'https://example.com/a']
+    assert bot.url_variants('https://example.com/a') == ['https://example.com/a', 'http://example.com/a']
+
+
+def test_duplicates_are_found_by_key_but_the_posted_url_is_kept():
+    store = bot.MemeStore()
+    posted = 'https://cdn.discordapp.com/attachments/1/2/a.png?ex=1&is=2&hm=3'
+    store.add(1, 10, posted, 0, url_key=bot.canonicalize_url(posted))
+    assert store.url(1) == posted
+    assert store.find_url(bot.canonicalize_url('https://media.discordapp.net/attachments/1/2/a.png')) == 1
+    assert store.find_url(posted) is None
+    assert list(store.urls()) == [posted]
+    assert store.meme_rows() == [[1, '10', posted, 0, 'https://cdn.discordapp.com/attachments/1/2/a.png']]
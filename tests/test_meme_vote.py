@@ -0,0 +1,35 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+
+
+class FailingStorage:
+    async def cast_vote(self, meme_id, voter_id, value):
+        raise OSError('disk I/O error')
+
+
+def test_failed_vote_write_leaves_memory_untouched(monkeypatch):
+    store = bot.MemeStore()
+    store.add(1, 5, 'https://example.com/a.png', 0)
+    monkeypatch.setattr(bot, 'meme_store', store)
+    monkeypatch.setattr(bot, 'meme_ledger', bot.VoteLedger(store))
+    monkeypatch.setattr(bot, 'storage', FailingStorage())
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def no_sync():
+        pass
+
+    monkeypatch.setattr(bot, 'sync_shared_state', no_sync)
+    ctx = SimpleNamespace(author=SimpleNamespace(id=6), send=send)
+    with pytest.raises(OSError):
+        asyncio.run(bot.meme_vote.callback(ctx, 1, 1))
+    assert bot.meme_ledger.score(1) == 0
+    assert bot.meme_ledger.vote_of(1, 6) == 0
+    assert 5 not in bot.votes
+    assert sent == []
@@ -0,0 +1,16 @@
+import bot
+
+
+def test_http_client_counters_render_as_counters(monkeypatch):
+    monkeypatch.setattr(bot.http_client, 'issued', 7)
+    text = bot.metrics.render()
+    assert '# TYPE bot_upstream_requests_issued_total counter' in text
+    assert 'bot_upstream_requests_issued_total 7' in text
+    for name in ('coalesced', 'retried', 'throttled'):
+        assert f'# TYPE bot_upstream_requests_{name}_total counter' in text
+    assert '# TYPE bot_log_records_dropped_total counter' in text
+
+
+def test_every_counter_name_ends_in_total():
+    counters = [name for name, (kind, _) in bot.metrics._help.items() if kind == 'counter']
+    assert counters and all(name.endswith('_total') for name in counters)
@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def guild_filter():
+    return bot.ProfanityFilter(bot.DEFAULT_BAD_WORDS)
+
+
+@pytest.mark.parametrize('text', ['fuck off', 'FUUUCK', 'sh1t', 'a$$', 'fúck', 'ѕhit', 'shitty', 'b!tches'])
+def test_flags_variants(guild_filter, text):
+    assert guild_filter.contains_profanity(text)
+
+
+@pytest.mark.parametrize('text', ['', 'hi !', 'ok 👍', 'nice meme :)', 'class', 'assume', 'scunthorpe', 'shitake'])
+def test_leaves_innocent_messages(guild_filter, text):
+    assert not guild_filter.contains_profanity(text)
+
+
+def test_guild_words_extend_defaults(guild_filter):
+    guild_filter.set_guild_words(1, ['heck'])
+    assert guild_filter.contains_profanity('what the heck', 1)
+    assert guild_filter.contains_profanity('fuck', 1)
+    assert not guild_filter.contains_profanity('what the heck', 2)
+
+
+def test_words_empty_after_normalizing_are_ignored(guild_filter):
+    guild_filter.set_guild_words(1, ['\u0301', '  ', '\u0301\u0308'])
+    for text in ('', 'hi !', 'ok 👍', 'nice meme :)'):
+        assert not guild_filter.contains_profanity(text, 1)
+    assert bot.compile_word_pattern(['\u0301']) is None
+
+
+def test_addbadword_rejects_words_empty_after_normalizing():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    ctx = SimpleNamespace(guild=SimpleNamespace(id=424242), send=send)
+    asyncio.run(bot.add_bad_word.callback(ctx, word=' \u0301 '))
+    assert len(sent) == 1 and sent[0].startswith('❗')
+    assert bot.profanity_filter.guild_words(424242) == []
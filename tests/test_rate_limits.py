@@ -0,0 +1,71 @@
+import time
+
+import bot
+
+
+def test_retry_after_seconds():
+    assert bot.rate_limit_delay({'retry-after': '7'}) == 7.0
+
+
+def test_imgur_user_quota_waits_for_user_reset():
+    # Header names as Imgur sends them, lower-cased the way _request stores them
+    headers = {name.lower(): value for name, value in {
+        'X-RateLimit-UserLimit': '500',
+        'X-RateLimit-UserRemaining': '0',
+        'X-RateLimit-UserReset': str(int(time.time()) + 120),
+        'X-RateLimit-ClientLimit': '12500',
+        'X-RateLimit-ClientRemaining': '9000',
+    }.items()}
+    assert 115 <= bot.rate_limit_delay(headers) <= 120
+
+
+def test_imgur_quota_left_means_no_delay():
+    headers = {
+        'x-ratelimit-userremaining': '42',
+        'x-ratelimit-userreset': str(int(time.time()) + 120),
+        'x-ratelimit-clientremaining': '9000',
+    }
+    assert bot.rate_limit_delay(headers) is None
+
+
+def test_imgur_client_quota_without_reset_waits_for_next_day():
+    headers = {'x-ratelimit-clientlimit': '12500', 'x-ratelimit-clientremaining': '0'}
+    delay = bot.rate_limit_delay(headers)
+    assert 0 < delay <= 86400
+    assert (time.time() + delay) % 86400 < 1
+
+
+def test_imgur_client_quota_uses_user_reset_when_given():
+    headers = {
+        'x-ratelimit-userremaining': '10',
+        'x-ratelimit-userreset': str(int(time.time()) + 300),
+        'x-ratelimit-clientremaining': '0',
+    }
+    assert 295 <= bot.rate_limit_delay(headers) <= 300
+
+
+def test_post_quota_reset_is_seconds():
+    headers = {'x-post-rate-limit-remaining': '0', 'x-post-rate-limit-reset': '30'}
+    assert bot.rate_limit_delay(headers) == 30.0
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    bucket = bot.TokenBucket(rate=10, capacity=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0, 0, 0]
+    assert 0.09 <= waits[3] <= 0.11
+    assert 0.19 <= waits[4] <= 0.21
+
+
+def test_token_bucket_release_returns_the_slot():
+    bucket = bot.TokenBucket(rate=1, capacity=1)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() > 0
+    bucket.release()
+    assert bucket.reserve() > 0
+
+
+def test_token_bucket_block_for_delays_the_next_reservation():
+    bucket = bot.TokenBucket(rate=100, capacity=10)
+    bucket.block_for(2)
+    assert 1.9 <= bucket.reserve() <= 2.0
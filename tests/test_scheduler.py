@@ -0,0 +1,128 @@
+import asyncio
+
+import bot
+
+
+def run_scheduler(setup, wait=0.15):
+    fired = []
+    scheduler = bot.Scheduler()
+
+    @scheduler.handler('ping')
+    async def ping(name):
+        fired.append(name)
+
+    async def main():
+        scheduler.start()
+        await setup(scheduler)
+        await asyncio.sleep(wait)
+        scheduler.stop()
+
+    asyncio.run(main())
+    return scheduler, fired
+
+
+def test_timers_fire_in_due_order():
+    async def setup(scheduler):
+        await scheduler.schedule('b', 'ping', 0.05, {'name': 'b'}, persist=False)
+        await scheduler.schedule('a', 'ping', 0.01, {'name': 'a'}, persist=False)
+
+    scheduler, fired = run_scheduler(setup)
+    assert fired == ['a', 'b']
+    assert len(scheduler) == 0
+
+
+def test_cancelled_timer_does_not_fire():
+    async def setup(scheduler):
+        await scheduler.schedule('a', 'ping', 0.01, {'name': 'a'}, persist=False)
+        await scheduler.schedule('b', 'ping', 0.02, {'name': 'b'}, persist=False)
+        assert await scheduler.cancel('a')
+        assert not await scheduler.cancel('a')
+
+    scheduler, fired = run_scheduler(setup)
+    assert fired == ['b']
+    assert scheduler._heap == []
+
+
+def test_rescheduling_an_id_replaces_the_pending_timer():
+    async def setup(scheduler):
+        await scheduler.schedule('mute', 'ping', 0.01, {'name': 'first'}, persist=False)
+        await scheduler.schedule('mute', 'ping', 0.05, {'name': 'second'}, persist=False)
+        # The first heap entry is still there until it surfaces
+        assert len(scheduler._heap) == 2
+        assert len(scheduler) == 1
+
+    scheduler, fired = run_scheduler(setup)
+    assert fired == ['second']
+    assert scheduler._heap == []
+
+
+def test_pending_timer_not_fired_early():
+    async def setup(scheduler):
+        await scheduler.schedule('later', 'ping', 60, {'name': 'later'}, persist=False)
+
+    scheduler, fired = run_scheduler(setup, wait=0.05)
+    assert fired == []
+    assert len(scheduler) == 1
+    assert scheduler.snapshot() == []
+
+
+class FakeStorage:
+    def __init__(self):
+        self.timers = {}
+
+    async def add_timer(self, timer):
+        self.timers[timer['id']] = timer
+
+    async def remove_timer(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+
+def test_failed_timer_is_kept_and_retried(monkeypatch):
+    fake_storage = FakeStorage()
+    monkeypatch.setattr(bot, 'storage', fake_storage)
+    monkeypatch.setattr(bot, 'TIMER_RETRY_BASE', 0.01)
+    attempts = []
+    scheduler = bot.Scheduler()
+
+    @scheduler.handler('unmute')
+    async def unmute(member_id):
+        attempts.append(member_id)
+        if len(attempts) < 3:
+            raise RuntimeError('Discord said no')
+
+    async def main():
+        scheduler.start()
+        await scheduler.schedule('mute:1', 'unmute', 0.01, {'member_id': 1})
+        await asyncio.sleep(0.02)
+        assert 'mute:1' in fake_storage.timers
+        await asyncio.sleep(0.2)
+        scheduler.stop()
+
+    asyncio.run(main())
+    assert attempts == [1, 1, 1]
+    assert fake_storage.timers == {}
+    assert len(scheduler) == 0
+
+
+def test_timer_dropped_after_max_retries(monkeypatch):
+    fake_storage = FakeStorage()
+    monkeypatch.setattr(bot, 'storage', fake_storage)
+    monkeypatch.setattr(bot, 'TIMER_RETRY_BASE', 0.005)
+    monkeypatch.setattr(bot, 'TIMER_MAX_RETRIES', 2)
+    attempts = []
+    scheduler = bot.Scheduler()
+
+    @scheduler.handler('unmute')
+    async def unmute(member_id):
+        attempts.append(member_id)
+        raise RuntimeError('Discord said no')
+
+    async def main():
+        scheduler.start()
+        await scheduler.schedule('mute:1', 'unmute', 0.005, {'member_id': 1})
+        await asyncio.sleep(0.2)
+        scheduler.stop()
+
+    asyncio.run(main())
+    assert attempts == [1, 1, 1]
+    assert fake_storage.timers == {}
@@ -0,0 +1,43 @@
+import json
+import sqlite3
+
+import bot
+
+
+def test_sqlite_backfills_url_keys_of_old_rows(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE memes (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                            url TEXT NOT NULL, created_at REAL NOT NULL);
+        INSERT INTO memes (user_id, url, created_at) VALUES ('1', 'https://imgur.com/abcdefg', 1.0);
+        INSERT INTO memes (user_id, url, created_at) VALUES ('1', 'https://example.com/a.png', 2.0);
+    """)
+    conn.commit()
+    conn.close()
+
+    storage = bot.SQLiteStorage(path)
+    memes = storage.load()['memes']
+    assert [list(row) for row in memes] == [
+        [1, '1', 'https://imgur.com/abcdefg', 1.0, 'https://i.imgur.com/abcdefg.jpg'],
+        [2, '1', 'https://example.com/a.png', 2.0, None],
+    ]
+    store = bot.MemeStore()
+    store.load(memes)
+    assert store.find_url(bot.canonicalize_url('https://i.imgur.com/abcdefg.png')) == 1
+
+
+def test_sqlite_imports_legacy_json_with_url_keys(tmp_path):
+    json_path = tmp_path / 'bot_data.json'
+    json_path.write_text(json.dumps({'user_memes': {'7': ['https://i.imgur.com/abcdefg.gifv']}, 'votes': {}}))
+    storage = bot.SQLiteStorage(str(tmp_path / 'new.db'), json_path=str(json_path))
+    (row,) = storage.load()['memes']
+    assert row[2] == 'https://i.imgur.com/abcdefg.gifv'
+    assert row[4] == 'https://i.imgur.com/abcdefg.mp4'
+
+
+def test_json_backend_keys_rows_written_before_url_keys(tmp_path):
+    path = tmp_path / 'bot_data.json'
+    path.write_text(json.dumps({'memes': [[1, '7', 'http://www.imgur.com/abcdefg', 1.0]], 'votes': {}}))
+    (row,) = bot.JSONStorage(str(path)).load()['memes']
+    assert row[4] == 'https://i.imgur.com/abcdefg.jpg'
@@ -0,0 +1,67 @@
+import bot
+
+
+def make_ledger(meme_ids=(1, 2, 3)):
+    store = bot.MemeStore()
+    store.load([(meme_id, str(100 + meme_id), f'https://i.imgur.com/meme{meme_id}.jpg', 1.7e9, None)
+                for meme_id in meme_ids])
+    return bot.VoteLedger(store)
+
+
+def test_vote_returns_delta():
+    ledger = make_ledger()
+    assert ledger.vote(1, 50, 1) == 1
+    assert ledger.vote(1, 50, 1) == 0
+    assert ledger.vote(1, 50, -1) == -2
+    assert ledger.vote(1, 50, 0) == 1
+    assert ledger.vote(1, 50, 0) == 0
+    assert ledger.score(1) == 0
+    assert len(ledger) == 0
+
+
+def test_one_vote_per_voter():
+    ledger = make_ledger()
+    for voter_id in (30, 10, 20):
+        ledger.vote(2, voter_id, 1)
+    ledger.vote(2, 10, -1)
+    assert ledger.score(2) == 1
+    assert len(ledger) == 3
+    assert sorted(ledger.vote_rows()) == [[2, 10, -1], [2, 20, 1], [2, 30, 1]]
+
+
+def test_top_ranks_memes_by_score():
+    ledger = make_ledger()
+    ledger.vote(1, 10, 1)
+    ledger.vote(3, 10, 1)
+    ledger.vote(3, 11, 1)
+    ledger.vote(2, 10, -1)
+    assert ledger.top(3) == [(3, 2), (1, 1), (2, -1)]
+
+
+def test_load_drops_votes_on_unknown_memes():
+    ledger = make_ledger(meme_ids=(1, 2))
+    ledger.load([[1, 10, 1], [1, 11, -1], [2, 10, 1], [9, 10, 1]])
+    assert ledger.score(1) == 0
+    assert ledger.score(2) == 1
+    assert ledger.score(9) == 0
+    assert len(ledger) == 3
+    assert ledger.vote(1, 11, 1) == 2
+
+
+def test_reset_votes():
+    ledger = make_ledger()
+    ledger.vote(1, 10, 1)
+    ledger.reset_votes()
+    assert ledger.score(1) == 0
+    assert ledger.top(5) == []
+    assert ledger.vote_rows() == []
+
+
+def test_vote_of():
+    ledger = make_ledger()
+    ledger.vote(1, 20, -1)
+    ledger.vote(1, 10, 1)
+    assert ledger.vote_of(1, 10) == 1
+    assert ledger.vote_of(1, '20') == -1
+    assert ledger.vote_of(1, 30) == 0
+    assert ledger.vote_of(2, 10) == 0
@@ -0,0 +1,68 @@
+import random
+
+import bot
+
+
+def test_rebuild_orders_by_score_then_user_id():
+    ranking = bot.VoteRanking()
+    ranking.rebuild({'30': 5, '10': 5, '20': 9, '40': -2})
+    assert ranking.top(10) == [(20, 9), (10, 5), (30, 5), (40, -2)]
+    assert [ranking.rank(user_id) for user_id in (20, 10, 30, 40)] == [1, 2, 3, 4]
+
+
+def test_update_moves_user():
+    ranking = bot.VoteRanking()
+    ranking.rebuild({1: 3, 2: 2, 3: 1})
+    ranking.update('3', 4)
+    ranking.update(1, 0)
+    assert ranking.top(3) == [(3, 4), (2, 2), (1, 0)]
+    assert ranking.rank(1) == 3
+    assert len(ranking) == 3
+
+
+def test_update_adds_new_user_and_top_truncates():
+    ranking = bot.VoteRanking()
+    ranking.update(7, 1)
+    ranking.update(8, 2)
+    ranking.update(9, 3)
+    assert ranking.top(2) == [(9, 3), (8, 2)]
+    assert ranking.score('8') == 2
+    assert ranking.score(99) == 0
+    assert ranking.rank(99) is None
+
+
+def test_order_matches_full_sort_after_many_updates():
+    rng = random.Random(3)
+    ranking = bot.VoteRanking()
+    expected = {}
+    for _ in range(500):
+        user_id = rng.randrange(40)
+        expected[user_id] = rng.randrange(-5, 6)
+        ranking.update(user_id, expected[user_id])
+    assert ranking.top(len(expected)) == sorted(expected.items(), key=lambda item: (-item[1], item[0]))
+    assert ranking.scores() == expected
+
+
+def test_clear():
+    ranking = bot.VoteRanking()
+    ranking.rebuild({1: 1})
+    ranking.clear()
+    assert ranking.top(5) == []
+    assert len(ranking) == 0
+
+
+def test_small_blocks_split_and_drain():
+    rng = random.Random(7)
+    ranking = bot.VoteRanking()
+    ranking.BLOCK_SIZE = 2
+    ranking.rebuild({user_id: rng.randrange(-3, 4) for user_id in range(20)})
+    expected = ranking.scores()
+    for _ in range(2000):
+        user_id = rng.randrange(60)
+        expected[user_id] = rng.randrange(-10, 11)
+        ranking.update(user_id, expected[user_id])
+    order = sorted(expected.items(), key=lambda item: (-item[1], item[0]))
+    assert ranking.top(len(order)) == order
+    assert ranking.top(7) == order[:7]
+    assert [ranking.rank(user_id) for user_id, _ in order] == list(range(1, len(order) + 1))
+    assert all(len(block) <= 4 for block in ranking._blocks)
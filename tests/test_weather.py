@@ -0,0 +1,61 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def weather_api(monkeypatch):
+    calls = []
+
+    def serve(status, body):
+        async def fetch(url, params=None, **kwargs):
+            calls.append(params['q'])
+            return bot.UpstreamResponse(status, 'OK', {}, json.dumps(body))
+        monkeypatch.setattr(bot.http_client, 'fetch', fetch)
+        return calls
+
+    bot.weather_cache.clear()
+    bot.unknown_cities.clear()
+    yield serve
+    bot.weather_cache.clear()
+    bot.unknown_cities.clear()
+
+
+@pytest.mark.parametrize('current', [{'temp_c': 12}, {'condition': {'text': 'Sunny'}}, {'temp_c': 12, 'condition': 'Sunny'}])
+def test_malformed_payload_is_not_cached(weather_api, current):
+    calls = weather_api(200, {'current': current})
+    for _ in range(2):
+        assert asyncio.run(bot.get_weather('Oslo')).startswith('❗')
+    assert len(calls) == 2
+    assert len(bot.weather_cache) == 0
+
+
+def test_good_payload_is_cached(weather_api):
+    calls = weather_api(200, {'current': {'temp_c': 12, 'condition': {'text': 'Sunny'}}})
+    first = asyncio.run(bot.get_weather('Oslo'))
+    assert 'Temperature: 12°C' in first and 'Sunny' in first
+    assert asyncio.run(bot.get_weather('oslo ')) == first.replace('Oslo', 'oslo ')
+    assert len(calls) == 1
+
+
+def test_weather_command_spends_budget_only_when_fetching(weather_api, monkeypatch):
+    weather_api(200, {'current': {'temp_c': 12, 'condition': {'text': 'Sunny'}}})
+    spent = []
+    sent = []
+
+    async def spend_upstream_budget(ctx, upstream, cost=1):
+        spent.append((upstream, cost))
+
+    async def send(message):
+        sent.append(message)
+
+    monkeypatch.setattr(bot, 'spend_upstream_budget', spend_upstream_budget)
+    ctx = SimpleNamespace(send=send)
+    for _ in range(3):
+        asyncio.run(bot.weather.callback(ctx, city='Oslo'))
+    assert spent == [('weather', 1)]
+    assert len(sent) == 3